@@ -0,0 +1,150 @@
+import argparse
+import json
+import math
+import os
+import platform
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any
+
+# The benchmark needs no display, Qt renders offscreen
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import cv2  # noqa: E402
+import mediapipe as mp  # noqa: E402
+from PySide6.QtCore import Qt  # noqa: E402
+from PySide6.QtGui import QGuiApplication  # noqa: E402
+
+from src.config import RecognitionConfig  # noqa: E402
+from src.frame_source import Pacing  # noqa: E402
+from src.hand_detector import HandsMode  # noqa: E402
+from src.thread import Thread  # noqa: E402
+
+
+def run_clip(config: RecognitionConfig) -> dict[str, Any]:
+    thread = Thread(config)
+    # There is no window, previews count as shown right away
+    thread.update_frame.connect(lambda _: thread.preview_shown(), Qt.ConnectionType.DirectConnection)
+    # and events are taken like the window does, so they don't pile up over a long clip
+    thread.events_ready.connect(thread.events.take, Qt.ConnectionType.DirectConnection)
+    start_time = time.perf_counter()
+    # Run the capture loop synchronously in this thread, no event loop is needed without a window
+    thread.run()
+    # The warm-up is reported in the startup gauge, it is not part of the frame rate
+    elapsed = time.perf_counter() - start_time - thread.startup.snapshot().get("warm_up", 0.0)
+    counters = thread.metrics.snapshot()["counters"]
+    # Frames that went through the whole pipeline, captured frames can be dropped by the queues
+    frames = counters.get("frames", 0)
+    return {
+        "source": config.source,
+        "frames": frames,
+        "captured_frames": thread.frame_index,
+        "rendered_frames": frames - counters.get("preview_skipped", 0),
+        "seconds": elapsed,
+        "fps": frames / elapsed if elapsed > 0 else 0.0,
+        "stages": thread.timings.summary(),
+        "counters": counters,
+        "detector": thread.keyframe_detector.stats(),
+        "gauges": thread.metrics.snapshot()["gauges"],
+    }
+
+
+def environment() -> dict[str, str]:
+    return {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": str(os.cpu_count()),
+        "mediapipe": mp.__version__,
+        "opencv": cv2.__version__,
+    }
+
+
+def compare(current: dict[str, Any], baseline: dict[str, Any]) -> None:
+    baseline_runs = {run["source"]: run for run in baseline["runs"]}
+    for run in current["runs"]:
+        base = baseline_runs.get(run["source"])
+        if base is None:
+            continue
+        print(f"{run['source']}: fps {base['fps']:.1f} -> {run['fps']:.1f}")
+        for stage, stats in run["stages"].items():
+            base_stats = base["stages"].get(stage)
+            if not base_stats:
+                continue
+            print(f"  {stage:<10} p95 {base_stats['p95_ms']:8.3f} ms -> {stats['p95_ms']:8.3f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Throughput benchmark of the gesture recognition loop")
+    parser.add_argument("clips", nargs="+", help="Video files or image directories to replay")
+    parser.add_argument("--repeat", type=int, default=1, help="Number of runs over every clip")
+    parser.add_argument(
+        "--pacing",
+        type=Pacing,
+        choices=[pacing.value for pacing in Pacing],
+        default=Pacing.fast,
+        help="fast measures the maximum throughput, realtime replays clips at their frame rate",
+    )
+    parser.add_argument(
+        "--hands-mode", type=HandsMode, choices=[mode.value for mode in HandsMode], default=HandsMode.video
+    )
+    parser.add_argument("--max-hands", type=int, default=1)
+    parser.add_argument("--inference-width", type=int, default=None)
+    parser.add_argument("--keyframe-interval", type=int, default=1)
+    parser.add_argument(
+        "--preview-fps",
+        type=float,
+        default=math.inf,
+        help="Preview frame rate, by default every frame is rendered so the drawing stages are measured on all of them, "
+        "0 disables the preview",
+    )
+    parser.add_argument("--cache-size", type=int, default=256, help="Classifier cache size, 0 disables the cache")
+    parser.add_argument("--output", default="benchmark_results.json", help="Where to write the JSON results")
+    parser.add_argument("--baseline", default=None, help="Previous results file to compare with")
+    args = parser.parse_args()
+
+    app = QGuiApplication([])  # noqa: F841, mouse mapping reads the screen geometry
+
+    runs = []
+    for clip in args.clips:
+        for _ in range(args.repeat):
+            config = RecognitionConfig(
+                source=clip,
+                pacing=args.pacing,
+                hands_mode=args.hands_mode,
+                max_num_hands=args.max_hands,
+                inference_width=args.inference_width,
+                keyframe_interval=args.keyframe_interval,
+                cache_size=args.cache_size,
+                preview_fps=args.preview_fps,
+            )
+            result = run_clip(config)
+            print(f"{clip}: {result['frames']} frames, {result['fps']:.1f} fps")
+            runs.append(result)
+
+    results = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "environment": environment(),
+        "settings": {
+            "pacing": args.pacing.value,
+            "hands_mode": args.hands_mode.value,
+            "max_hands": args.max_hands,
+            "inference_width": args.inference_width,
+            "keyframe_interval": args.keyframe_interval,
+            "cache_size": args.cache_size,
+            # Infinity is not valid JSON
+            "preview_fps": args.preview_fps if math.isfinite(args.preview_fps) else None,
+        },
+        "runs": runs,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    if args.baseline is not None:
+        with open(args.baseline, encoding="utf-8") as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
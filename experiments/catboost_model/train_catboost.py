@@ -1,5 +1,6 @@
 import mlflow
 import numpy as np
+import onnx
 import optuna
 from catboost import CatBoostClassifier
 from optuna.trial import Trial
@@ -56,6 +57,9 @@ def main():
         f1 = f1_score(y_test, y_pred, average="macro")
         mlflow.log_metric("f1", f1)
         mlflow.sklearn.log_model(clf, "model")
+        # ONNX copy for the app's onnxruntime backend
+        clf.save_model("model.onnx", format="onnx")
+        mlflow.onnx.log_model(onnx.load("model.onnx"), "model_onnx")
         accuracy = accuracy_score(y_test, y_pred)
         mlflow.log_metric("accuracy", accuracy)
         mlflow.log_params(trial.params)
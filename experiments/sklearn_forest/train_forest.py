@@ -2,6 +2,7 @@ import mlflow
 import numpy as np
 import optuna
 from optuna.trial import Trial
+from skl2onnx import to_onnx
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import accuracy_score, f1_score
 from sklearn.model_selection import train_test_split
@@ -59,6 +60,9 @@ def main():
         f1 = f1_score(y_test, y_pred, average="macro")
         mlflow.log_metric("f1", f1)
         mlflow.sklearn.log_model(clf, "model")
+        # ONNX copy for the app's onnxruntime backend, the ONNX ML operators take float32
+        onnx_model = to_onnx(clf, X_train[:1].astype(np.float32), options={id(clf): {"zipmap": False}})
+        mlflow.onnx.log_model(onnx_model, "model_onnx")
         accuracy = accuracy_score(y_test, y_pred)
         mlflow.log_metric("accuracy", accuracy)
         mlflow.log_params(trial.params)
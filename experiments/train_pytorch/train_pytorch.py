@@ -1,7 +1,9 @@
 import argparse
+import time
 
 import mlflow.pytorch
 import numpy as np
+import onnx
 import torch
 import torch.nn.functional as F
 from sklearn.metrics import accuracy_score, f1_score
@@ -135,6 +137,52 @@ def train(
         print(f"\nTest Epoch {epoch + 1}: Accuracy={test_accuracy:.4f}, F1={test_f1:.4f}\n")
 
 
+def predict_labels(model: nn.Module, X: torch.Tensor) -> np.ndarray:
+    with torch.no_grad():
+        return model(X).argmax(dim=1).numpy()
+
+
+def measure_latency(model: nn.Module, X: torch.Tensor, repeat: int = 1000) -> float:
+    """
+    Median time of one forward pass in milliseconds
+    """
+    times = []
+    with torch.no_grad():
+        for _ in range(10):  # warm-up
+            model(X)
+        for _ in range(repeat):
+            start_time = time.perf_counter()
+            model(X)
+            times.append(time.perf_counter() - start_time)
+    return float(np.median(times) * 1000)
+
+
+def quantize(model: nn.Module) -> torch.jit.ScriptModule:
+    """
+    Post-training dynamic quantization: int8 weights, activations are quantized on the fly,
+    so no calibration data is needed
+    """
+    model.eval()
+    quantized_model = torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+    return torch.jit.script(quantized_model)
+
+
+def quantization_report(models: dict[str, nn.Module], test_data: np.ndarray) -> dict[str, dict[str, float]]:
+    X = torch.tensor(test_data[:, :-1], dtype=torch.float32)
+    y = test_data[:, -1].astype(np.int64)
+    # The app classifies on one thread next to the camera and MediaPipe
+    torch.set_num_threads(1)
+
+    report = {}
+    for name, model in models.items():
+        report[name] = {
+            "f1": float(f1_score(y, predict_labels(model, X), average="macro")),
+            "single_latency_ms": measure_latency(model, X[:1]),
+            "batch_latency_ms": measure_latency(model, X[:BATCH_SIZE], repeat=200),
+        }
+    return report
+
+
 def main():
     parser = argparse.ArgumentParser(description="PyTorch MNIST Example")
     parser.add_argument(
@@ -170,6 +218,30 @@ def main():
 
     mlflow.pytorch.log_model(scripted_model, "model")  # logging scripted model
 
+    # ONNX copy for the app's onnxruntime backend, batch size is dynamic to classify all hands with one call
+    scripted_model.eval()
+    torch.onnx.export(
+        scripted_model,
+        torch.zeros(1, 43),
+        "model.onnx",
+        input_names=["input"],
+        output_names=["logits"],
+        dynamic_axes={"input": {0: "batch"}, "logits": {0: "batch"}},
+    )
+    mlflow.onnx.log_model(onnx.load("model.onnx"), "model_onnx")
+
+    # int8 copy for slow CPUs, the app loads model_int8.pt with torch.jit.load
+    quantized_model = quantize(model)
+    torch.jit.save(quantized_model, "model_int8.pt")
+    mlflow.pytorch.log_model(quantized_model, "model_int8")
+    mlflow.log_artifact("model_int8.pt")
+
+    report = quantization_report({"float": scripted_model, "int8": quantized_model}, test_data)
+    mlflow.log_dict(report, "quantization_report.json")
+    for name, values in report.items():
+        mlflow.log_metrics({f"{name}_{metric}": value for metric, value in values.items()})
+    print(f"Quantization report: {report}")
+
 
 if __name__ == "__main__":
     main()
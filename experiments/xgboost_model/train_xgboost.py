@@ -1,6 +1,8 @@
 import mlflow
 import numpy as np
 import optuna
+from onnxmltools import convert_xgboost
+from onnxmltools.convert.common.data_types import FloatTensorType
 from optuna.trial import Trial
 from sklearn.metrics import accuracy_score, f1_score
 from sklearn.model_selection import train_test_split
@@ -60,6 +62,9 @@ def main():
         f1 = f1_score(y_test, y_pred, average="macro")
         mlflow.log_metric("f1", f1)
         mlflow.sklearn.log_model(clf, "model")
+        # ONNX copy for the app's onnxruntime backend
+        onnx_model = convert_xgboost(clf, initial_types=[("input", FloatTensorType([None, X_train.shape[1]]))])
+        mlflow.onnx.log_model(onnx_model, "model_onnx")
         accuracy = accuracy_score(y_test, y_pred)
         mlflow.log_metric("accuracy", accuracy)
         mlflow.log_params(trial.params)
@@ -0,0 +1,141 @@
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+
+from pynput import keyboard
+from pynput.mouse import Button
+
+from src.logger import get_logger
+from src.metrics import StageTimings
+from src.process_keyboard.keyboard_press import press_keyboard
+from src.process_mouse.move_mouse import mouse, mouse_button, moves_cursor
+
+
+@dataclass
+class KeyCombo:
+    keys: list[keyboard.Key | keyboard.KeyCode]
+    submitted: float = field(default_factory=time.perf_counter)
+
+
+@dataclass
+class MouseButton:
+    button: Button
+    pressed: bool
+    submitted: float = field(default_factory=time.perf_counter)
+
+
+@dataclass
+class MouseMove:
+    dx: int
+    dy: int
+    submitted: float = field(default_factory=time.perf_counter)
+
+
+Action = KeyCombo | MouseButton | MouseMove
+
+
+class Actuator(threading.Thread):
+    """
+    Injects keyboard and mouse input in its own thread, so a slow OS call never blocks the GUI.
+    Actions are executed in the order they were submitted. A mouse move submitted while the previous one
+    is still waiting is merged into it. A button is released no earlier than `min_hold` seconds after
+    its press, so quick gestures still make clicks the applications see, and `key_hold` keeps the keys
+    of a combination pressed for that long.
+    """
+
+    def __init__(self, timings: StageTimings | None = None, min_hold: float = 0.03, key_hold: float = 0.01) -> None:
+        super().__init__(name="actuator", daemon=True)
+        self.logger = get_logger(self.__class__.__name__)
+        self.timings = timings if timings is not None else StageTimings()
+        self.min_hold = min_hold
+        self.key_hold = key_hold
+        self._actions: deque[Action] = deque()
+        self._changed = threading.Condition()
+        self._stopped = False
+        self._pressed_at: dict[Button, float] = {}
+        self.max_queue_depth = 0
+        self.injected = 0
+        self.merged_moves = 0
+        self.errors = 0
+
+    def submit(self, action: Action) -> None:
+        with self._changed:
+            if self._stopped:
+                return
+            last = self._actions[-1] if self._actions else None
+            if isinstance(action, MouseMove) and isinstance(last, MouseMove):
+                # The latency is still measured from the first merged move
+                last.dx += action.dx
+                last.dy += action.dy
+                self.merged_moves += 1
+                return
+            self._actions.append(action)
+            self.max_queue_depth = max(self.max_queue_depth, len(self._actions))
+            self._changed.notify()
+
+    def press_keys(self, keys: list[keyboard.Key | keyboard.KeyCode]) -> None:
+        self.submit(KeyCombo(list(keys)))
+
+    def action_mouse(self, mouse_values: dict[str, str], label: str, is_start: bool = True) -> None:
+        button = mouse_button(mouse_values, label)
+        if button is not None:
+            self.submit(MouseButton(button, is_start))
+
+    def move_mouse(self, mouse_values: dict[str, str], label: str, dx: int, dy: int) -> None:
+        if moves_cursor(mouse_values, label) and (dx != 0 or dy != 0):
+            self.submit(MouseMove(dx, dy))
+
+    def execute(self, action: Action) -> None:
+        match action:
+            case KeyCombo(keys=keys):
+                press_keyboard(keys, self.key_hold)
+            case MouseButton(button=button, pressed=True):
+                mouse.press(button)
+                self._pressed_at[button] = time.perf_counter()
+            case MouseButton(button=button, pressed=False):
+                pressed_at = self._pressed_at.pop(button, None)
+                if pressed_at is not None:
+                    delay = pressed_at + self.min_hold - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                mouse.release(button)
+            case MouseMove(dx=dx, dy=dy):
+                mouse.move(dx, dy)
+
+    def run(self) -> None:
+        while True:
+            with self._changed:
+                self._changed.wait_for(lambda: len(self._actions) > 0 or self._stopped)
+                if not self._actions:
+                    break
+                action = self._actions.popleft()
+            try:
+                self.execute(action)
+                self.injected += 1
+            except Exception as err:
+                self.errors += 1
+                self.logger.error("Input injection failed: %s", err)
+            self.timings.record("injection", time.perf_counter() - action.submitted)
+
+        # Don't leave buttons pressed after the application is closed
+        for button in list(self._pressed_at):
+            self.execute(MouseButton(button, False))
+
+    def stop(self) -> None:
+        """
+        Executes the already submitted actions and stops the thread
+        """
+        with self._changed:
+            self._stopped = True
+            self._changed.notify()
+        self.join()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "queue_depth": len(self._actions),
+            "max_queue_depth": self.max_queue_depth,
+            "injected": self.injected,
+            "merged_moves": self.merged_moves,
+            "errors": self.errors,
+        }
@@ -1,13 +1,191 @@
 from argparse import ArgumentParser
 
+from src.config import RecognitionConfig
+from src.frame_source import Pacing
+from src.hand_detector import HandsMode
 
-def get_device() -> int:
+
+def get_config() -> RecognitionConfig:
     parser = ArgumentParser(description="PyTorch MNIST Example")
     parser.add_argument(
-        "--device", "-d",
+        "--device",
+        "-d",
         type=int,
         default=0,
         help="Webcam device number",
     )
+    parser.add_argument(
+        "--source",
+        default=None,
+        help="Video file or image directory to read frames from instead of the webcam",
+    )
+    parser.add_argument(
+        "--pacing",
+        type=Pacing,
+        choices=[pacing.value for pacing in Pacing],
+        default=Pacing.realtime,
+        help="realtime: replay the source at its frame rate, fast: read frames as fast as they are processed",
+    )
+    parser.add_argument(
+        "--source-fps",
+        type=float,
+        default=None,
+        help="Frame rate of the source for realtime pacing",
+    )
+    parser.add_argument(
+        "--model",
+        default="model.pkl",
+        help=(
+            "Gesture classifier: pickled sklearn model, .npz bundle compiled with python -m src.classifier.export"
+            ", .onnx or TorchScript .pt exported by the experiments, or an MLflow URI (models:/name/version)"
+        ),
+    )
+    parser.add_argument(
+        "--watch-model",
+        action="store_true",
+        help="Reload the model without restarting when the file or the MLflow model changes",
+    )
+    parser.add_argument(
+        "--watch-interval",
+        type=float,
+        default=2.0,
+        help="Seconds between checks of the model for changes",
+    )
+    parser.add_argument(
+        "--holdout",
+        default=None,
+        help="processed.npy like file, a new model is used only if its accuracy on it is high enough",
+    )
+    parser.add_argument(
+        "--min-holdout-accuracy",
+        type=float,
+        default=0.9,
+        help="Minimal accuracy of a new model on the holdout",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=256,
+        help="Number of cached classifier predictions, 0 disables the cache",
+    )
+    parser.add_argument(
+        "--cache-tolerance",
+        type=float,
+        default=0.01,
+        help="Features are rounded to this step before the cache lookup",
+    )
+    parser.add_argument(
+        "--hands-mode",
+        type=HandsMode,
+        choices=[mode.value for mode in HandsMode],
+        default=HandsMode.video,
+        help="video: track hands between frames and re-detect only when tracking is lost, "
+        "image: run full detection on every frame",
+    )
+    parser.add_argument(
+        "--max-hands",
+        type=int,
+        default=1,
+        help="Number of hands to recognize, every hand drives its own gestures",
+    )
+    parser.add_argument(
+        "--inference-width",
+        type=int,
+        default=None,
+        help="Downscale frames to this width before hand detection, the aspect ratio is kept",
+    )
+    parser.add_argument(
+        "--keyframe-interval",
+        type=int,
+        default=1,
+        help="Run hand detection on every N-th frame and predict landmarks in between, 0 chooses N automatically",
+    )
+    parser.add_argument(
+        "--motion-threshold",
+        type=float,
+        default=4.0,
+        help="Difference to the previous frame that forces hand detection before the next keyframe",
+    )
+    parser.add_argument(
+        "--preview-fps",
+        type=float,
+        default=15.0,
+        help="Frame rate of the camera preview in the window, 0 disables the preview",
+    )
+    parser.add_argument(
+        "--active-region",
+        type=float,
+        nargs=4,
+        default=(0.0, 0.0, 0.8, 0.8),
+        metavar=("X0", "Y0", "X1", "Y1"),
+        help="Part of the camera frame in relative coordinates that is mapped to the screen",
+    )
+    parser.add_argument(
+        "--screen",
+        type=int,
+        default=None,
+        help="Number of the screen controlled by the cursor, by default the cursor spans all screens",
+    )
+    parser.add_argument(
+        "--cursor-min-cutoff",
+        type=float,
+        default=1.0,
+        help="Cutoff frequency of the cursor filter at rest in Hz, lower is smoother, 0 disables the filter",
+    )
+    parser.add_argument(
+        "--cursor-beta",
+        type=float,
+        default=0.007,
+        help="Growth of the cursor filter cutoff with the speed, higher means less lag on fast movements",
+    )
+    parser.add_argument(
+        "--cursor-prediction",
+        type=float,
+        default=0.0,
+        help="Extrapolate the cursor this many seconds ahead to compensate the latency, e.g. 0.03",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=None,
+        help="Serve stage latencies and counters as JSON on http://127.0.0.1:PORT/metrics",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        default=None,
+        help="Periodically dump stage latencies and counters to this JSON file",
+    )
+    parser.add_argument(
+        "--metrics-interval",
+        type=float,
+        default=5.0,
+        help="Seconds between metrics dumps",
+    )
     args = parser.parse_args()
-    return args.device
+    return RecognitionConfig(
+        device=args.device,
+        source=args.source,
+        pacing=args.pacing,
+        source_fps=args.source_fps,
+        model_path=args.model,
+        cache_size=args.cache_size,
+        cache_tolerance=args.cache_tolerance,
+        watch_model=args.watch_model,
+        watch_interval=args.watch_interval,
+        holdout_path=args.holdout,
+        min_holdout_accuracy=args.min_holdout_accuracy,
+        hands_mode=args.hands_mode,
+        max_num_hands=args.max_hands,
+        inference_width=args.inference_width,
+        keyframe_interval=args.keyframe_interval,
+        motion_threshold=args.motion_threshold,
+        preview_fps=args.preview_fps,
+        active_region=tuple(args.active_region),
+        screen=args.screen,
+        cursor_min_cutoff=args.cursor_min_cutoff,
+        cursor_beta=args.cursor_beta,
+        cursor_prediction=args.cursor_prediction,
+        metrics_port=args.metrics_port,
+        metrics_file=args.metrics_file,
+        metrics_interval=args.metrics_interval,
+    )
@@ -0,0 +1,37 @@
+import threading
+
+import numpy as np
+
+
+class BufferPool:
+    """
+    Reusable arrays for the per-frame images. A buffer is taken with `acquire` and given back with `release`
+    once nothing refers to it anymore. An empty pool allocates a new buffer, so the pool grows to the number
+    of frames in flight and then stops allocating.
+    """
+
+    def __init__(self) -> None:
+        self._free: dict[tuple[tuple[int, ...], str], list[np.ndarray]] = {}
+        self._lock = threading.Lock()
+        self.allocations = 0
+        self.reuses = 0
+
+    def acquire(self, shape: tuple[int, ...], dtype: type = np.uint8) -> np.ndarray:
+        key = (tuple(shape), np.dtype(dtype).str)
+        with self._lock:
+            free = self._free.get(key)
+            if free:
+                self.reuses += 1
+                return free.pop()
+            self.allocations += 1
+        return np.empty(shape, dtype=dtype)
+
+    def release(self, buffer: np.ndarray) -> None:
+        key = (buffer.shape, buffer.dtype.str)
+        with self._lock:
+            self._free.setdefault(key, []).append(buffer)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            free = sum(len(buffers) for buffers in self._free.values())
+        return {"allocations": self.allocations, "reuses": self.reuses, "free": free}
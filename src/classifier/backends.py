@@ -0,0 +1,134 @@
+import os
+import pickle
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+from typing import Any
+
+import numpy as np
+
+from src.classifier.bundle import GESTURE_LABELS, MOUSE_LABELS, load_bundle
+
+
+class ClassifierBackend(ABC):
+    """
+    Gesture classifier used by the capture loop, `predict` takes (N, n_features) rows and returns N class ids.
+    `labels` is the gesture of every class id and `mouse_labels` are the gestures that move the cursor,
+    only model bundles store their own, other models use the labels of the dataset.
+    """
+
+    name: str
+    labels: list[str] = GESTURE_LABELS
+    mouse_labels: list[str] = MOUSE_LABELS
+
+    @abstractmethod
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        pass
+
+
+class SklearnBackend(ClassifierBackend):
+    name = "sklearn"
+
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as f:
+            self.model = pickle.load(f)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return np.asarray(self.model.predict(X))
+
+
+class NumpyBackend(ClassifierBackend):
+    """
+    Model bundle exported with python -m src.classifier.export, validated against the features of the app.
+    The weights are memory mapped unless `mmap` is False.
+    """
+
+    name = "numpy"
+
+    def __init__(self, path: str, mmap: bool = True) -> None:
+        bundle = load_bundle(path, mmap=mmap)
+        self.model = bundle.predictor
+        self.labels = bundle.labels
+        self.mouse_labels = bundle.mouse_labels
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.model.predict(X)
+
+
+class OnnxBackend(ClassifierBackend):
+    """
+    ONNX Runtime on CPU. Works with models exported by skl2onnx, onnxmltools, CatBoost and torch.onnx:
+    a `label` output is used as is, otherwise the first output holds class scores.
+    """
+
+    name = "onnx"
+
+    def __init__(self, path: str, threads: int = 1) -> None:
+        # Imported here, so the other backends don't need onnxruntime installed
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        # The models are tiny, waking up a thread pool costs more than the inference
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.input_dtype = np.float64 if model_input.type == "tensor(double)" else np.float32
+
+        outputs = {output.name: output for output in self.session.get_outputs()}
+        self.returns_labels = "label" in outputs
+        self.output_name = "label" if self.returns_labels else self.session.get_outputs()[0].name
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        outputs: list[Any] = self.session.run(
+            [self.output_name], {self.input_name: X.astype(self.input_dtype, copy=False)}
+        )
+        result = np.asarray(outputs[0])
+        if self.returns_labels:
+            return result.reshape(-1)
+        return np.asarray(result.argmax(axis=1))
+
+
+class TorchScriptBackend(ClassifierBackend):
+    """
+    TorchScript GestureClassifier from experiments/train_pytorch, float or int8 quantized
+    """
+
+    name = "torchscript"
+
+    def __init__(self, path: str, threads: int = 1) -> None:
+        # torch is only needed for this backend
+        import torch
+
+        torch.set_num_threads(threads)
+        self.torch = torch
+        self.model = torch.jit.load(path, map_location="cpu")
+        self.model.eval()
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        with self.torch.no_grad():
+            logits = self.model(self.torch.from_numpy(X.astype(np.float32, copy=False)))
+        return np.asarray(logits.argmax(dim=1).numpy())
+
+
+# Backend constructors by the model file extension
+BACKENDS: dict[str, Callable[[str], ClassifierBackend]] = {
+    ".onnx": OnnxBackend,
+    ".npz": NumpyBackend,
+    ".pt": TorchScriptBackend,
+    # Model file of the mlflow.pytorch flavor, TorchScript for the scripted models of train_pytorch
+    ".pth": TorchScriptBackend,
+}
+
+
+def load_backend(path: str, mmap: bool = True) -> ClassifierBackend:
+    """
+    `mmap=False` loads a copy of the bundle weights, for files that may be rewritten in place while in use
+    """
+    extension = os.path.splitext(path)[1].lower()
+    backend = BACKENDS.get(extension, SklearnBackend)
+    if backend is NumpyBackend:
+        return NumpyBackend(path, mmap)
+    return backend(path)
@@ -0,0 +1,147 @@
+import json
+from dataclasses import asdict, dataclass, field, fields
+from typing import Any
+
+import numpy as np
+
+from src.classifier.numpy_predictor import (
+    PREDICTORS,
+    NumpyPredictor,
+    load_arrays,
+    save_arrays,
+)
+from src.drawing import WRIST
+
+# Version of the bundle layout, bundles of other versions are rejected
+BUNDLE_VERSION = 1
+
+# Gesture of every class id of the models trained on the dataset
+GESTURE_LABELS = [
+    "two_fingers_near",
+    "one",
+    "two",
+    "three",
+    "four",
+    "five",
+    "ok",
+    "c",
+    "heavy",
+    "hang",
+    "palm",
+    "l",
+    "like",
+    "dislike",
+    "fist",
+]
+# Gestures that move the cursor
+MOUSE_LABELS = ["two_fingers_near", "one", "l"]
+
+
+@dataclass(frozen=True)
+class FeatureSchema:
+    """
+    Layout of the feature vector: `coordinates` of every landmark relative to `reference_landmark`,
+    divided by their max absolute value, then 1 for a right hand and 0 for a left one
+    """
+
+    version: int = 1
+    landmarks: int = 21
+    coordinates: str = "xy"
+    reference_landmark: int = WRIST
+    scaling: str = "max_abs"
+    handedness: bool = True
+
+    @property
+    def n_features(self) -> int:
+        return self.landmarks * len(self.coordinates) + int(self.handedness)
+
+
+# Features computed by the capture loop, see calc_landmark_batch
+FEATURE_SCHEMA = FeatureSchema()
+
+
+@dataclass
+class ModelBundle:
+    """
+    NumPy predictor together with everything the app needs to use it: the gesture of every class,
+    the gestures that move the cursor and the features it was trained on
+    """
+
+    predictor: NumpyPredictor
+    labels: list[str] = field(default_factory=lambda: list(GESTURE_LABELS))
+    mouse_labels: list[str] = field(default_factory=lambda: list(MOUSE_LABELS))
+    schema: FeatureSchema = FEATURE_SCHEMA
+    n_features: int = FEATURE_SCHEMA.n_features
+
+    def metadata(self) -> dict[str, Any]:
+        return {
+            "bundle_version": BUNDLE_VERSION,
+            "labels": self.labels,
+            "mouse_labels": self.mouse_labels,
+            "feature_schema": asdict(self.schema),
+            "n_features": self.n_features,
+        }
+
+    def validate(self, schema: FeatureSchema = FEATURE_SCHEMA) -> None:
+        """
+        Raises ValueError if the model can't be used with the features computed by the app
+        """
+        if self.schema != schema:
+            raise ValueError(f"Model is trained on features {asdict(self.schema)}, the app computes {asdict(schema)}")
+        if self.n_features != schema.n_features:
+            raise ValueError(f"Model expects {self.n_features} features, the schema has {schema.n_features}")
+
+        # Classes of models trained on processed.npy are floats holding the label ids
+        classes = self.predictor.classes
+        if not np.array_equal(classes, np.rint(classes)) or classes.min() < 0 or classes.max() >= len(self.labels):
+            raise ValueError(f"Model classes {classes.tolist()} are not ids of the {len(self.labels)} labels")
+        unknown_labels = set(self.mouse_labels) - set(self.labels)
+        if unknown_labels:
+            raise ValueError(f"Unknown mouse gestures {sorted(unknown_labels)}")
+
+        try:
+            self.predictor.predict(np.zeros((1, self.n_features)))
+        except (ValueError, IndexError) as err:
+            # Tree ensembles index the features, other predictors fail on the matrix shapes
+            raise ValueError(f"Model doesn't take {self.n_features} features: {err}") from err
+
+
+def save_bundle(bundle: ModelBundle, path: str) -> None:
+    bundle.validate(bundle.schema)
+    # The metadata is stored as a JSON string so no pickle is needed
+    save_arrays(
+        {
+            "kind": np.array(bundle.predictor.kind),
+            "metadata": np.array(json.dumps(bundle.metadata())),
+            **bundle.predictor.to_arrays(),
+        },
+        path,
+    )
+
+
+def load_bundle(path: str, schema: FeatureSchema = FEATURE_SCHEMA, mmap: bool = True) -> ModelBundle:
+    # Weights are memory mapped, so loading doesn't copy them
+    arrays = load_arrays(path, mmap)
+    if "metadata" not in arrays:
+        raise ValueError(f"{path} is not a model bundle, export it with python -m src.classifier.export")
+    metadata = json.loads(str(arrays.pop("metadata")))
+    if metadata.get("bundle_version") != BUNDLE_VERSION:
+        raise ValueError(f"{path} has bundle version {metadata.get('bundle_version')}, expected {BUNDLE_VERSION}")
+
+    kind = str(arrays.pop("kind"))
+    if kind not in PREDICTORS:
+        raise ValueError(f"{path} has an unknown predictor {kind}")
+    schema_keys = {schema_field.name for schema_field in fields(FeatureSchema)}
+    if set(metadata["feature_schema"]) != schema_keys:
+        raise ValueError(
+            f"{path} has feature schema fields {sorted(metadata['feature_schema'])}, expected {sorted(schema_keys)}"
+        )
+    bundle = ModelBundle(
+        PREDICTORS[kind].from_arrays(arrays),
+        labels=list(metadata["labels"]),
+        mouse_labels=list(metadata["mouse_labels"]),
+        schema=FeatureSchema(**metadata["feature_schema"]),
+        n_features=int(metadata["n_features"]),
+    )
+    bundle.validate(schema)
+    return bundle
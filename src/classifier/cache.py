@@ -0,0 +1,97 @@
+from collections import OrderedDict
+
+import numpy as np
+
+from src.classifier.backends import ClassifierBackend
+
+
+class CachedClassifier(ClassifierBackend):
+    """
+    LRU cache in front of a classifier. A feature vector that differs from a cached one by at most `tolerance`
+    in every feature reuses its label, so a hand held still is classified once.
+    Vectors are looked up by their cell on a grid with the step `tolerance` first and, as 43 features easily
+    cross a cell border, then compared with all cached vectors.
+    """
+
+    def __init__(self, backend: ClassifierBackend, tolerance: float = 0.01, maxsize: int = 256) -> None:
+        self.backend = backend
+        self.name = f"cached {backend.name}"
+        self.labels = backend.labels
+        self.mouse_labels = backend.mouse_labels
+        self.tolerance = tolerance
+        self.maxsize = maxsize
+        # Grid cell -> slot in the arrays below, ordered from the least recently used
+        self._slots: OrderedDict[bytes, int] = OrderedDict()
+        self._slot_keys: list[bytes] = []
+        self._vectors: np.ndarray | None = None
+        self._labels = np.empty(maxsize, dtype=np.int64)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, x: np.ndarray) -> bytes:
+        return np.rint(x / self.tolerance).astype(np.int32).tobytes()
+
+    def lookup(self, key: bytes, x: np.ndarray) -> int | None:
+        slot = self._slots.get(key)
+        if slot is None and self._vectors is not None and self._slot_keys:
+            distances = np.abs(self._vectors[: len(self._slot_keys)] - x).max(axis=1)
+            nearest = int(distances.argmin())
+            if distances[nearest] <= self.tolerance:
+                slot = nearest
+        if slot is None:
+            return None
+        self._slots.move_to_end(self._slot_keys[slot])
+        return int(self._labels[slot])
+
+    def store(self, key: bytes, x: np.ndarray, label: int) -> None:
+        if self._vectors is None:
+            self._vectors = np.empty((self.maxsize, len(x)), dtype=np.float64)
+        if key in self._slots:
+            slot = self._slots[key]
+            self._slots.move_to_end(key)
+        elif len(self._slot_keys) < self.maxsize:
+            slot = len(self._slot_keys)
+            self._slot_keys.append(key)
+            self._slots[key] = slot
+        else:
+            _, slot = self._slots.popitem(last=False)
+            self.evictions += 1
+            self._slot_keys[slot] = key
+            self._slots[key] = slot
+        self._vectors[slot] = x
+        self._labels[slot] = label
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        keys = [self.key(x) for x in X]
+        labels = np.empty(len(X), dtype=np.int64)
+        missed = []
+        for i, (key, x) in enumerate(zip(keys, X)):
+            label = self.lookup(key, x)
+            if label is None:
+                missed.append(i)
+            else:
+                labels[i] = label
+        self.hits += len(X) - len(missed)
+        self.misses += len(missed)
+
+        if missed:
+            # Misses of all hands still go to the model in one call
+            for i, label in zip(missed, self.backend.predict(X[missed])):
+                labels[i] = int(label)
+                self.store(keys[i], X[i], int(label))
+        return labels
+
+    def clear(self) -> None:
+        self._slots.clear()
+        self._slot_keys.clear()
+
+    def stats(self) -> dict[str, int | float]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._slots),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,85 @@
+import argparse
+import os
+import pickle
+import time
+from typing import Any
+
+import numpy as np
+
+from src.classifier.bundle import (
+    GESTURE_LABELS,
+    MOUSE_LABELS,
+    ModelBundle,
+    load_bundle,
+    save_bundle,
+)
+from src.classifier.numpy_predictor import NumpyPredictor, compile_estimator
+
+
+def sample_features(n_samples: int, n_features: int, seed: int = 0) -> np.ndarray:
+    # Landmark features are scaled to [-1, 1], the last feature is the is_right flag
+    rng = np.random.default_rng(seed)
+    X = rng.uniform(-1, 1, (n_samples, n_features))
+    X[:, -1] = rng.integers(0, 2, n_samples)
+    return X
+
+
+def mismatch_rate(estimator: Any, predictor: NumpyPredictor, X: np.ndarray) -> float:
+    expected = estimator.predict(X)
+    # Row by row like in the capture loop, reusing the preallocated buffers
+    single = np.concatenate([predictor.predict(row[np.newaxis]) for row in X])
+    batched = predictor.predict(X)
+    return float(max(np.mean(single != expected), np.mean(batched != expected)))
+
+
+def single_row_latency(model: Any, row: np.ndarray, repeat: int = 1000) -> float:
+    start_time = time.perf_counter()
+    for _ in range(repeat):
+        model.predict(row)
+    return (time.perf_counter() - start_time) / repeat
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compile a pickled sklearn classifier to a NumPy model bundle")
+    parser.add_argument("model", help="Pickled sklearn estimator, e.g. model.pkl")
+    parser.add_argument("output", help="Where to write the .npz bundle")
+    parser.add_argument("--data", default=None, help="processed.npy to check the predictions on")
+    parser.add_argument("--samples", type=int, default=5000, help="Number of random rows without --data")
+    parser.add_argument("--max-mismatch", type=float, default=0.0, help="Allowed share of different predictions")
+    parser.add_argument(
+        "--labels", nargs="+", default=GESTURE_LABELS, help="Gesture of every class id, the dataset gestures by default"
+    )
+    parser.add_argument(
+        "--mouse-labels", nargs="+", default=MOUSE_LABELS, help="Gestures that move the cursor, one of --labels each"
+    )
+    args = parser.parse_args()
+
+    with open(args.model, "rb") as f:
+        estimator = pickle.load(f)
+    predictor = compile_estimator(estimator)
+
+    if args.data is not None:
+        X = np.load(args.data)[:, :-1]
+    else:
+        X = sample_features(args.samples, estimator.n_features_in_)
+
+    # Checked before it replaces the output, a watching app never sees a rejected bundle
+    tmp_path = f"{args.output}.tmp.npz"
+    save_bundle(ModelBundle(predictor, args.labels, args.mouse_labels, n_features=estimator.n_features_in_), tmp_path)
+    # Check the saved file, not only the object in memory
+    rate = mismatch_rate(estimator, load_bundle(tmp_path).predictor, X)
+    print(f"{type(estimator).__name__} -> {predictor.kind}: {rate:.4%} of {len(X)} predictions differ")
+    if rate > args.max_mismatch:
+        os.remove(tmp_path)
+        raise SystemExit(f"Predictions differ from {args.model}, {args.output} is not written")
+    os.replace(tmp_path, args.output)
+
+    row = X[:1]
+    print(
+        f"Single row predict: sklearn {single_row_latency(estimator, row) * 1e6:.1f} us, "
+        f"numpy {single_row_latency(predictor, row) * 1e6:.1f} us"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,489 @@
+import os
+import struct
+import zipfile
+from abc import ABC, abstractmethod
+from typing import Any
+
+import numpy as np
+
+# Arrays of a predictor, saved to an uncompressed .npz file
+PredictorArrays = dict[str, np.ndarray]
+
+
+class NumpyPredictor(ABC):
+    """
+    Pure NumPy replacement of a fitted sklearn classifier.
+    `decision` returns per class scores whose argmax is the predicted class, intermediate results
+    are written into buffers that are reused while the batch size stays the same.
+    """
+
+    kind: str
+
+    def __init__(self, classes: np.ndarray) -> None:
+        self.classes = classes
+        self._buffers: dict[str, np.ndarray] = {}
+
+    def buffer(self, name: str, shape: tuple[int, ...], dtype: Any = np.float64) -> np.ndarray:
+        buffer = self._buffers.get(name)
+        if buffer is None or buffer.shape != shape or buffer.dtype != dtype:
+            buffer = self._buffers[name] = np.empty(shape, dtype=dtype)
+        return buffer
+
+    @abstractmethod
+    def decision(self, X: np.ndarray) -> np.ndarray:
+        pass
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return np.asarray(self.classes[self.decision(np.asarray(X, dtype=np.float64)).argmax(axis=1)])
+
+    @abstractmethod
+    def to_arrays(self) -> PredictorArrays:
+        pass
+
+    @classmethod
+    @abstractmethod
+    def from_arrays(cls, arrays: PredictorArrays) -> "NumpyPredictor":
+        pass
+
+
+def binary_to_two_columns(weights: np.ndarray, bias: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # A binary classifier predicts the second class for a positive score, the same as argmax over [0, score]
+    return np.hstack((np.zeros_like(weights), weights)), np.hstack((np.zeros_like(bias), bias))
+
+
+class LinearPredictor(NumpyPredictor):
+    """
+    LogisticRegression, LinearSVC, RidgeClassifier, SGDClassifier
+    """
+
+    kind = "linear"
+
+    def __init__(self, classes: np.ndarray, weights: np.ndarray, bias: np.ndarray) -> None:
+        super().__init__(classes)
+        # (n_features, n_classes)
+        self.weights = weights
+        self.bias = bias
+
+    @classmethod
+    def from_estimator(cls, estimator: Any) -> "LinearPredictor":
+        weights = np.atleast_2d(estimator.coef_).T.astype(np.float64)
+        bias = np.atleast_1d(estimator.intercept_).astype(np.float64)
+        if weights.shape[1] == 1:
+            weights, bias = binary_to_two_columns(weights, bias)
+        return cls(estimator.classes_, weights, bias)
+
+    def decision(self, X: np.ndarray) -> np.ndarray:
+        scores = np.matmul(X, self.weights, out=self.buffer("scores", (len(X), self.weights.shape[1])))
+        scores += self.bias
+        return scores
+
+    def to_arrays(self) -> PredictorArrays:
+        return {"classes": self.classes, "weights": self.weights, "bias": self.bias}
+
+    @classmethod
+    def from_arrays(cls, arrays: PredictorArrays) -> "LinearPredictor":
+        return cls(arrays["classes"], arrays["weights"], arrays["bias"])
+
+
+class SVCPredictor(NumpyPredictor):
+    """
+    Kernel SVC with one-vs-one voting like libsvm
+    """
+
+    kind = "svc"
+
+    def __init__(
+        self,
+        classes: np.ndarray,
+        support_vectors: np.ndarray,
+        pair_coefs: np.ndarray,
+        intercept: np.ndarray,
+        vote_diff: np.ndarray,
+        vote_base: np.ndarray,
+        kernel: str,
+        gamma: float,
+        coef0: float,
+        degree: int,
+    ) -> None:
+        super().__init__(classes)
+        self.support_vectors = support_vectors
+        # (n_support_vectors, n_pairs) coefficients of every support vector in every class pair decision
+        self.pair_coefs = pair_coefs
+        self.intercept = intercept
+        # Votes are vote_base + (decision > 0) @ vote_diff
+        self.vote_diff = vote_diff
+        self.vote_base = vote_base
+        self.kernel = kernel
+        self.gamma = gamma
+        self.coef0 = coef0
+        self.degree = degree
+        self.support_norms = (support_vectors**2).sum(axis=1)
+
+    @classmethod
+    def from_estimator(cls, estimator: Any) -> "SVCPredictor":
+        if estimator.kernel not in ("linear", "poly", "rbf", "sigmoid"):
+            raise ValueError(f"Unsupported SVC kernel {estimator.kernel}")
+        n_classes = len(estimator.classes_)
+        # Raw libsvm coefficients, sklearn flips the sign of the public ones for binary problems
+        dual_coef = estimator._dual_coef_
+        starts = np.concatenate(([0], np.cumsum(estimator.n_support_)))
+        pairs = [(i, j) for i in range(n_classes) for j in range(i + 1, n_classes)]
+
+        pair_coefs = np.zeros((len(estimator.support_vectors_), len(pairs)))
+        vote_diff = np.zeros((len(pairs), n_classes))
+        vote_base = np.zeros(n_classes)
+        for p, (i, j) in enumerate(pairs):
+            support_i, support_j = slice(starts[i], starts[i + 1]), slice(starts[j], starts[j + 1])
+            pair_coefs[support_i, p] = dual_coef[j - 1, support_i]
+            pair_coefs[support_j, p] = dual_coef[i, support_j]
+            vote_diff[p, i] += 1
+            vote_diff[p, j] -= 1
+            vote_base[j] += 1
+
+        return cls(
+            estimator.classes_,
+            np.asarray(estimator.support_vectors_, dtype=np.float64),
+            pair_coefs,
+            estimator._intercept_.astype(np.float64),
+            vote_diff,
+            vote_base,
+            estimator.kernel,
+            float(estimator._gamma),
+            float(estimator.coef0),
+            int(estimator.degree),
+        )
+
+    def kernel_matrix(self, X: np.ndarray) -> np.ndarray:
+        gram = np.matmul(X, self.support_vectors.T, out=self.buffer("kernel", (len(X), len(self.support_vectors))))
+        match self.kernel:
+            case "linear":
+                pass
+            case "poly":
+                gram *= self.gamma
+                gram += self.coef0
+                np.power(gram, self.degree, out=gram)
+            case "rbf":
+                # ||x - sv||^2 = ||x||^2 - 2 x.sv + ||sv||^2
+                gram *= -2
+                gram += (X**2).sum(axis=1, keepdims=True)
+                gram += self.support_norms
+                gram *= -self.gamma
+                np.exp(gram, out=gram)
+            case "sigmoid":
+                gram *= self.gamma
+                gram += self.coef0
+                np.tanh(gram, out=gram)
+        return gram
+
+    def decision(self, X: np.ndarray) -> np.ndarray:
+        pair_decisions = np.matmul(
+            self.kernel_matrix(X), self.pair_coefs, out=self.buffer("pairs", (len(X), self.pair_coefs.shape[1]))
+        )
+        pair_decisions += self.intercept
+        positive = np.greater(pair_decisions, 0, out=self.buffer("positive", pair_decisions.shape))
+        votes = np.matmul(positive, self.vote_diff, out=self.buffer("votes", (len(X), len(self.classes))))
+        votes += self.vote_base
+        return votes
+
+    def to_arrays(self) -> PredictorArrays:
+        return {
+            "classes": self.classes,
+            "support_vectors": self.support_vectors,
+            "pair_coefs": self.pair_coefs,
+            "intercept": self.intercept,
+            "vote_diff": self.vote_diff,
+            "vote_base": self.vote_base,
+            "kernel": np.array(self.kernel),
+            "gamma": np.array(self.gamma),
+            "coef0": np.array(self.coef0),
+            "degree": np.array(self.degree),
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays: PredictorArrays) -> "SVCPredictor":
+        return cls(
+            arrays["classes"],
+            arrays["support_vectors"],
+            arrays["pair_coefs"],
+            arrays["intercept"],
+            arrays["vote_diff"],
+            arrays["vote_base"],
+            str(arrays["kernel"]),
+            float(arrays["gamma"]),
+            float(arrays["coef0"]),
+            int(arrays["degree"]),
+        )
+
+
+class MLPPredictor(NumpyPredictor):
+    """
+    MLPClassifier, the output activation is skipped because it doesn't change the argmax
+    """
+
+    kind = "mlp"
+    activations = ("identity", "relu", "tanh", "logistic")
+
+    def __init__(
+        self, classes: np.ndarray, weights: list[np.ndarray], biases: list[np.ndarray], activation: str
+    ) -> None:
+        super().__init__(classes)
+        if activation not in self.activations:
+            raise ValueError(f"Unsupported MLP activation {activation}")
+        self.weights = weights
+        self.biases = biases
+        self.activation = activation
+
+    @classmethod
+    def from_estimator(cls, estimator: Any) -> "MLPPredictor":
+        if estimator.out_activation_ not in ("softmax", "logistic") or len(estimator.classes_) < 2:
+            raise ValueError("Only single label MLPClassifier is supported")
+        weights = [np.asarray(w, dtype=np.float64) for w in estimator.coefs_]
+        biases = [np.asarray(b, dtype=np.float64) for b in estimator.intercepts_]
+        if weights[-1].shape[1] == 1:
+            weights[-1], biases[-1] = binary_to_two_columns(weights[-1], biases[-1])
+        return cls(estimator.classes_, weights, biases, estimator.activation)
+
+    def decision(self, X: np.ndarray) -> np.ndarray:
+        hidden = X
+        last_layer = len(self.weights) - 1
+        for layer, (weights, bias) in enumerate(zip(self.weights, self.biases)):
+            hidden = np.matmul(hidden, weights, out=self.buffer(f"layer_{layer}", (len(X), weights.shape[1])))
+            hidden += bias
+            if layer == last_layer:
+                break
+            match self.activation:
+                case "relu":
+                    np.maximum(hidden, 0, out=hidden)
+                case "tanh":
+                    np.tanh(hidden, out=hidden)
+                case "logistic":
+                    np.negative(hidden, out=hidden)
+                    np.exp(hidden, out=hidden)
+                    hidden += 1
+                    np.reciprocal(hidden, out=hidden)
+        return hidden
+
+    def to_arrays(self) -> PredictorArrays:
+        arrays = {"classes": self.classes, "activation": np.array(self.activation)}
+        for layer, (weights, bias) in enumerate(zip(self.weights, self.biases)):
+            arrays[f"weights_{layer}"] = weights
+            arrays[f"biases_{layer}"] = bias
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays: PredictorArrays) -> "MLPPredictor":
+        n_layers = sum(1 for key in arrays if key.startswith("weights_"))
+        return cls(
+            arrays["classes"],
+            [arrays[f"weights_{layer}"] for layer in range(n_layers)],
+            [arrays[f"biases_{layer}"] for layer in range(n_layers)],
+            str(arrays["activation"]),
+        )
+
+
+class TreeEnsemblePredictor(NumpyPredictor):
+    """
+    Random forest, extra trees and gradient boosting. All trees are packed into flat node arrays
+    and traversed together, one level per step.
+    """
+
+    kind = "trees"
+
+    def __init__(
+        self,
+        classes: np.ndarray,
+        features: np.ndarray,
+        thresholds: np.ndarray,
+        children: np.ndarray,
+        values: np.ndarray,
+        roots: np.ndarray,
+        baseline: np.ndarray,
+        depth: int,
+    ) -> None:
+        super().__init__(classes)
+        self.features = features
+        self.thresholds = thresholds
+        # (n_nodes, 2) left and right child, leaves point to themselves
+        self.children = children
+        # (n_nodes, n_classes) contribution of every leaf to the class scores
+        self.values = values
+        self.roots = roots
+        self.baseline = baseline
+        self.depth = depth
+
+    @classmethod
+    def from_estimator(cls, estimator: Any) -> "TreeEnsemblePredictor":
+        classes = estimator.classes_
+        n_classes = len(classes)
+        trees: list[tuple[Any, np.ndarray]] = []
+        if hasattr(estimator, "estimators_") and hasattr(estimator, "learning_rate"):
+            # Gradient boosting: regression trees on raw scores, one tree per class and stage
+            for stage in estimator.estimators_:
+                for k, tree in enumerate(stage):
+                    column = np.zeros(n_classes)
+                    column[k if n_classes > 2 else 1] = estimator.learning_rate
+                    trees.append((tree.tree_, column))
+            if estimator.init_ == "zero":
+                baseline = np.zeros(n_classes)
+            else:
+                raw = estimator._raw_predict_init(np.zeros((1, estimator.n_features_in_)))[0]
+                baseline = raw if n_classes > 2 else np.array([0.0, raw[0]])
+            normalize = False
+        else:
+            # Forest: class probabilities averaged over the trees
+            for tree in estimator.estimators_:
+                trees.append((tree.tree_, np.full(n_classes, 1 / len(estimator.estimators_))))
+            baseline = np.zeros(n_classes)
+            normalize = True
+
+        features, thresholds, children, values, roots = [], [], [], [], []
+        offset = 0
+        depth = 0
+        for tree, scale in trees:
+            is_leaf = tree.children_left == -1
+            node_ids = np.arange(tree.node_count)
+            left = np.where(is_leaf, node_ids, tree.children_left) + offset
+            right = np.where(is_leaf, node_ids, tree.children_right) + offset
+            value = tree.value[:, 0, :]
+            if normalize:
+                value = value / value.sum(axis=1, keepdims=True)
+                node_values = value * scale
+            else:
+                node_values = value[:, :1] * scale
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+            children.append(np.column_stack((left, right)))
+            values.append(node_values)
+            roots.append(offset)
+            offset += tree.node_count
+            depth = max(depth, tree.max_depth)
+
+        return cls(
+            classes,
+            np.concatenate(features).astype(np.intp),
+            np.concatenate(thresholds),
+            np.concatenate(children).astype(np.intp),
+            np.concatenate(values),
+            np.array(roots, dtype=np.intp),
+            baseline.astype(np.float64),
+            depth,
+        )
+
+    def decision(self, X: np.ndarray) -> np.ndarray:
+        # sklearn compares float32 features with float64 thresholds
+        X32 = X.astype(np.float32)
+        rows = np.arange(len(X))[:, np.newaxis]
+        nodes = self.buffer("nodes", (len(X), len(self.roots)), np.intp)
+        nodes[:] = self.roots
+        for _ in range(self.depth):
+            go_right = X32[rows, self.features[nodes]] > self.thresholds[nodes]
+            nodes[:] = self.children[nodes, go_right.astype(np.intp)]
+        scores = np.sum(self.values[nodes], axis=1, out=self.buffer("scores", (len(X), len(self.classes))))
+        scores += self.baseline
+        return scores
+
+    def to_arrays(self) -> PredictorArrays:
+        return {
+            "classes": self.classes,
+            "features": self.features,
+            "thresholds": self.thresholds,
+            "children": self.children,
+            "values": self.values,
+            "roots": self.roots,
+            "baseline": self.baseline,
+            "depth": np.array(self.depth),
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays: PredictorArrays) -> "TreeEnsemblePredictor":
+        return cls(
+            arrays["classes"],
+            arrays["features"],
+            arrays["thresholds"],
+            arrays["children"],
+            arrays["values"],
+            arrays["roots"],
+            arrays["baseline"],
+            int(arrays["depth"]),
+        )
+
+
+PREDICTORS: dict[str, type[NumpyPredictor]] = {
+    predictor.kind: predictor for predictor in (LinearPredictor, SVCPredictor, MLPPredictor, TreeEnsemblePredictor)
+}
+
+
+def compile_estimator(estimator: Any) -> NumpyPredictor:
+    from sklearn.ensemble import (
+        ExtraTreesClassifier,
+        GradientBoostingClassifier,
+        RandomForestClassifier,
+    )
+    from sklearn.linear_model import LogisticRegression, RidgeClassifier, SGDClassifier
+    from sklearn.neural_network import MLPClassifier
+    from sklearn.svm import SVC, LinearSVC
+
+    match estimator:
+        case LogisticRegression() | LinearSVC() | RidgeClassifier() | SGDClassifier():
+            return LinearPredictor.from_estimator(estimator)
+        case SVC():
+            return SVCPredictor.from_estimator(estimator)
+        case MLPClassifier():
+            return MLPPredictor.from_estimator(estimator)
+        case RandomForestClassifier() | ExtraTreesClassifier() | GradientBoostingClassifier():
+            return TreeEnsemblePredictor.from_estimator(estimator)
+    raise TypeError(f"Can't compile {type(estimator).__name__} to a NumPy predictor")
+
+
+def save_arrays(arrays: PredictorArrays, path: str) -> None:
+    """
+    Writes the arrays to an uncompressed .npz file, one NAME.npy member per array like np.savez
+    """
+    tmp_path = f"{path}.tmp.npz"
+    with zipfile.ZipFile(tmp_path, "w", compression=zipfile.ZIP_STORED) as zf:
+        for name, array in arrays.items():
+            with zf.open(f"{name}.npy", "w", force_zip64=True) as f:
+                np.lib.format.write_array(f, np.asanyarray(array), allow_pickle=False)
+    # Loaded files are memory mapped, rewriting one in place would crash the process using it
+    os.replace(tmp_path, path)
+
+
+def load_arrays(path: str, mmap: bool = True) -> PredictorArrays:
+    """
+    Arrays of an uncompressed .npz file, mapped into memory read only instead of read, or copied with `mmap=False`.
+    np.load can't map .npz members, so the offset of every member is taken from the zip headers.
+    """
+    arrays: PredictorArrays = {}
+    with open(path, "rb") as f, zipfile.ZipFile(f) as zf:
+        for info in zf.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"{path} is compressed, its arrays can't be memory mapped")
+            # Local file header: 30 bytes, then the file name and the extra field
+            f.seek(info.header_offset + 26)
+            name_length, extra_length = struct.unpack("<HH", f.read(4))
+            f.seek(info.header_offset + 30 + name_length + extra_length)
+            major, _ = np.lib.format.read_magic(f)
+            read_header = np.lib.format.read_array_header_1_0 if major == 1 else np.lib.format.read_array_header_2_0
+            shape, fortran_order, dtype = read_header(f)
+            if dtype.hasobject:
+                raise ValueError(f"{path} has an object array {info.filename}")
+            name = info.filename.removesuffix(".npy")
+            if int(np.prod(shape)) <= 1:
+                # Scalars and empty arrays can't be mapped
+                arrays[name] = np.fromfile(f, dtype=dtype, count=int(np.prod(shape))).reshape(shape)
+            else:
+                arrays[name] = np.memmap(
+                    path, dtype=dtype, mode="r", offset=f.tell(), shape=shape, order="F" if fortran_order else "C"
+                )
+    if not mmap:
+        arrays = {name: np.array(array) for name, array in arrays.items()}
+    return arrays
+
+
+def save_predictor(predictor: NumpyPredictor, path: str) -> None:
+    save_arrays({"kind": np.array(predictor.kind), **predictor.to_arrays()}, path)
+
+
+def load_predictor(path: str) -> NumpyPredictor:
+    arrays = load_arrays(path)
+    return PREDICTORS[str(arrays.pop("kind"))].from_arrays(arrays)
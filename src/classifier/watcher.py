@@ -0,0 +1,162 @@
+import os
+import threading
+import time
+from collections.abc import Callable
+
+import numpy as np
+
+from src.classifier.backends import ClassifierBackend, load_backend
+from src.classifier.bundle import FEATURE_SCHEMA
+from src.logger import get_logger
+
+# Model files of the MLflow flavors the backends can load, in order of preference.
+# data/model.pth is the mlflow.pytorch flavor, loaded as TorchScript
+MLFLOW_MODEL_FILES = ("model.npz", "model.onnx", "model.pt", os.path.join("data", "model.pth"), "model.pkl")
+
+
+def is_mlflow_uri(uri: str) -> bool:
+    return uri.startswith(("models:/", "runs:/"))
+
+
+def model_signature(uri: str) -> str:
+    """
+    Changes whenever the model behind `uri` changes
+    """
+    if is_mlflow_uri(uri):
+        # mlflow is only needed for MLflow URIs
+        from mlflow.models import get_model_info
+
+        # Downloads only the MLmodel file, every logged model has its own uuid
+        return str(get_model_info(uri).model_uuid)
+    stat = os.stat(uri)
+    return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+
+def resolve_model(uri: str) -> str:
+    """
+    Path of the model file, models from MLflow are downloaded to a temporary directory.
+    A URI of a single artifact file (runs:/id/model_int8.pt) is used as is.
+    """
+    if not is_mlflow_uri(uri):
+        return uri
+    import mlflow
+
+    local_path = mlflow.artifacts.download_artifacts(artifact_uri=uri)
+    if os.path.isfile(local_path):
+        return str(local_path)
+    for file_name in MLFLOW_MODEL_FILES:
+        path = os.path.join(local_path, file_name)
+        if os.path.exists(path):
+            return path
+    raise ValueError(f"{uri} has none of the model files {MLFLOW_MODEL_FILES}")
+
+
+def load_model(uri: str, mmap: bool = True) -> ClassifierBackend:
+    model = load_backend(resolve_model(uri), mmap)
+    # The first prediction may be much slower than the next ones
+    model.predict(np.zeros((1, FEATURE_SCHEMA.n_features)))
+    return model
+
+
+def load_holdout(path: str, max_rows: int = 1000, seed: int = 0) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Features and labels from a processed.npy like file, at most `max_rows` random rows
+    """
+    data = np.load(path)
+    if len(data) > max_rows:
+        data = data[np.random.default_rng(seed).choice(len(data), max_rows, replace=False)]
+    return data[:, :-1], data[:, -1]
+
+
+class ModelWatcher(threading.Thread):
+    """
+    Polls a model file or an MLflow model URI every `interval` seconds. A changed model is loaded
+    once it has stayed the same for two polls, so a file that is still being written is never read.
+    The model is warmed up and, with a holdout, rejected if its accuracy is below `min_accuracy`,
+    all in this thread, then passed to `on_model`.
+    """
+
+    def __init__(
+        self,
+        uri: str,
+        on_model: Callable[[ClassifierBackend], None],
+        signature: str | None = None,
+        interval: float = 2.0,
+        holdout: tuple[np.ndarray, np.ndarray] | None = None,
+        min_accuracy: float = 0.9,
+    ) -> None:
+        super().__init__(name="model-watcher", daemon=True)
+        self.logger = get_logger(self.__class__.__name__)
+        self.uri = uri
+        self.on_model = on_model
+        # Signature of the model in use and of a changed model seen on the last poll
+        self.signature = signature
+        self._pending_signature: str | None = None
+        self.interval = interval
+        self.holdout = holdout
+        self.min_accuracy = min_accuracy
+        self.stop_event = threading.Event()
+        self.swaps = 0
+        self.rejected = 0
+        self.last_accuracy: float | None = None
+        self.last_load_time: float | None = None
+
+    def accuracy(self, model: ClassifierBackend) -> float | None:
+        if self.holdout is None:
+            return None
+        X, y = self.holdout
+        return float(np.mean(model.predict(X) == y))
+
+    def poll(self) -> None:
+        try:
+            signature = model_signature(self.uri)
+        except Exception as err:
+            self.logger.warning("Can't check the model %s: %s", self.uri, err)
+            return
+        if signature == self.signature:
+            self._pending_signature = None
+            return
+        if signature != self._pending_signature:
+            self._pending_signature = signature
+            return
+
+        # A broken model is not retried until it changes again
+        self.signature = signature
+        self._pending_signature = None
+        start_time = time.perf_counter()
+        try:
+            # The watched file may be rewritten in place, a memory mapped model would crash then
+            model = load_model(self.uri, mmap=False)
+            accuracy = self.accuracy(model)
+        except Exception as err:
+            self.rejected += 1
+            self.logger.error("New model %s can't be loaded: %s", self.uri, err)
+            return
+        self.last_load_time = time.perf_counter() - start_time
+        self.last_accuracy = accuracy
+        if accuracy is not None and accuracy < self.min_accuracy:
+            self.rejected += 1
+            self.logger.error(
+                "New model %s rejected, holdout accuracy %.3f < %.3f", self.uri, accuracy, self.min_accuracy
+            )
+            return
+
+        self.swaps += 1
+        self.logger.info("New model %s loaded in %.3f s, holdout accuracy %s", self.uri, self.last_load_time, accuracy)
+        self.on_model(model)
+
+    def run(self) -> None:
+        while not self.stop_event.wait(self.interval):
+            self.poll()
+
+    def stop(self) -> None:
+        self.stop_event.set()
+        self.join()
+
+    def stats(self) -> dict[str, int | float | None]:
+        return {
+            "swaps": self.swaps,
+            "rejected": self.rejected,
+            "last_accuracy": self.last_accuracy,
+            "last_load_time": self.last_load_time,
+        }
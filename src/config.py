@@ -0,0 +1,50 @@
+from dataclasses import dataclass
+
+from src.frame_source import Pacing
+from src.hand_detector import HandsMode
+
+
+@dataclass
+class RecognitionConfig:
+    device: int = 0
+    # Video file or image directory used instead of the camera
+    source: str | None = None
+    pacing: Pacing = Pacing.realtime
+    # Frame rate of recorded sources, by default taken from the video or 30 for image directories
+    source_fps: float | None = None
+    # Pickled sklearn estimator, a NumPy model bundle compiled from it (.npz), ONNX (.onnx) or TorchScript (.pt) model,
+    # or an MLflow URI of one of them (models:/name/version, runs:/id/path)
+    model_path: str = "model.pkl"
+    # LRU cache of predictions, features within `cache_tolerance` of a cached vector reuse its label, 0 disables it
+    cache_size: int = 256
+    cache_tolerance: float = 0.01
+    # Reload the model when the file or the MLflow model behind `model_path` changes, checked every `watch_interval`
+    # seconds. With `holdout_path` (processed.npy format) a new model is used only if its accuracy on it is at least
+    # `min_holdout_accuracy`
+    watch_model: bool = False
+    watch_interval: float = 2.0
+    holdout_path: str | None = None
+    min_holdout_accuracy: float = 0.9
+    hands_mode: HandsMode = HandsMode.video
+    max_num_hands: int = 1
+    # Width of the frames passed to MediaPipe, None keeps the camera resolution
+    inference_width: int | None = None
+    # Run hand detection on every N-th frame and predict landmarks in between, 0 picks N automatically
+    keyframe_interval: int = 1
+    max_keyframe_interval: int = 4
+    # Mean gray level difference to the previous frame that forces a new detection
+    motion_threshold: float = 4.0
+    # Preview frame rate, independent of the recognition frame rate, 0 disables the preview, inf renders every frame
+    preview_fps: float = 15.0
+    # Part of the camera frame (x0, y0, x1, y1) mapped to the screen number `screen`, None spans all screens
+    active_region: tuple[float, float, float, float] = (0.0, 0.0, 0.8, 0.8)
+    screen: int | None = None
+    # One Euro filter of the cursor: cutoff frequency at rest in Hz (0 disables it) and its growth with the speed
+    cursor_min_cutoff: float = 1.0
+    cursor_beta: float = 0.007
+    # Seconds the filtered cursor position is extrapolated ahead
+    cursor_prediction: float = 0.0
+    # Local HTTP port serving the metrics as JSON and file for periodic JSON dumps, None disables them
+    metrics_port: int | None = None
+    metrics_file: str | None = None
+    metrics_interval: float = 5.0
@@ -0,0 +1,77 @@
+import glob
+import hashlib
+import json
+import os
+import time
+from typing import Any
+
+import numpy as np
+
+
+def file_hash(path: str, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def parameters_hash(parameters: dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(parameters, sort_keys=True).encode()).hexdigest()[:16]
+
+
+class LandmarkCache:
+    """
+    Features extracted from the dataset images, keyed by the hash of the image file and the flip.
+    Every set of extraction parameters has its own directory, so changing a threshold or MediaPipe
+    never reuses stale landmarks. Images without a detected hand are cached too, as NaN rows.
+    New entries are written by `flush` to a new segment file, an interrupted build keeps everything
+    flushed before.
+    """
+
+    def __init__(self, cache_dir: str, parameters: dict[str, Any], n_features: int) -> None:
+        self.dir = os.path.join(cache_dir, parameters_hash(parameters))
+        self.n_features = n_features
+        os.makedirs(self.dir, exist_ok=True)
+        parameters_path = os.path.join(self.dir, "parameters.json")
+        if not os.path.exists(parameters_path):
+            with open(parameters_path, "w", encoding="utf-8") as f:
+                json.dump(parameters, f, indent=2)
+
+        self._entries: dict[str, np.ndarray] = {}
+        self._new: dict[str, np.ndarray] = {}
+        for segment in sorted(glob.glob(os.path.join(self.dir, "segment_*.npz"))):
+            with np.load(segment, allow_pickle=False) as data:
+                self._entries.update(zip(data["keys"].tolist(), data["features"]))
+
+    @staticmethod
+    def key(image_hash: str, flip: bool) -> str:
+        return f"{image_hash}:{int(flip)}"
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> np.ndarray | None:
+        """
+        Features of a cached key, None if no hand was detected
+        """
+        features = self._entries[key]
+        return None if np.isnan(features[0]) else features
+
+    def put(self, key: str, features: np.ndarray | None) -> None:
+        if features is None:
+            features = np.full(self.n_features, np.nan)
+        self._entries[key] = self._new[key] = features
+
+    def flush(self) -> None:
+        if not self._new:
+            return
+        path = os.path.join(self.dir, f"segment_{time.time_ns()}.npz")
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, keys=np.array(list(self._new)), features=np.stack(list(self._new.values())))
+        # Readers never see a partially written segment
+        os.replace(tmp_path, path)
+        self._new.clear()
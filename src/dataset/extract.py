@@ -0,0 +1,199 @@
+import argparse
+import multiprocessing
+import os
+import time
+from importlib.metadata import version
+from typing import Any
+
+import cv2
+import numpy as np
+
+from src.classifier.bundle import FEATURE_SCHEMA
+from src.dataset.cache import LandmarkCache, file_hash
+from src.drawing import calc_landmark_batch, landmarks_to_array
+
+# Label, image path
+Task = tuple[int, str]
+
+# One MediaPipe Hands instance per worker process, created by init_worker
+_hands: Any = None
+
+
+def dataset_files(dataset_dir: str = "dataset/", class_size: int = 1_000, seed: int = 0) -> list[Task]:
+    """
+    `class_size` different images of every NN_label directory or all of them in a smaller one, the class id is NN
+    """
+    rng = np.random.default_rng(seed)
+    files_dataset = []
+    for dir_label in sorted(os.listdir(dataset_dir)):
+        dir_label_path = os.path.join(dataset_dir, dir_label)
+        if os.path.isfile(dir_label_path):
+            continue
+        index = int(dir_label.split("_")[0])
+        # Sorted, so the same seed picks the same files on every run
+        files = sorted(os.listdir(dir_label_path))
+        files_dataset.extend(
+            [
+                (index, os.path.join(dir_label_path, str(img_path)))
+                for img_path in rng.choice(files, size=min(class_size, len(files)), replace=False)
+            ]
+        )
+    return files_dataset
+
+
+def init_worker(min_detection_confidence: float, min_tracking_confidence: float) -> None:
+    global _hands
+    import mediapipe as mp
+
+    _hands = mp.solutions.hands.Hands(
+        static_image_mode=True,
+        max_num_hands=1,
+        min_detection_confidence=min_detection_confidence,
+        min_tracking_confidence=min_tracking_confidence,
+    )
+
+
+def extract_landmarks(filename: str, flip: bool = False) -> np.ndarray | None:
+    """
+    42 features and is_right of the hand on the image, the same features as in the app
+    """
+    image = cv2.imread(filename)
+    if image is None:
+        return None
+    image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    if flip:
+        image = cv2.flip(image, 1)
+
+    results = _hands.process(image)
+    if results.multi_hand_landmarks is None:
+        return None
+    landmark_array = landmarks_to_array(results.multi_hand_landmarks[0])
+    is_right = results.multi_handedness[0].classification[0].label == "Right"
+    return np.append(calc_landmark_batch(landmark_array[np.newaxis])[0], is_right)
+
+
+def extract_flips(task: tuple[str, tuple[bool, ...]]) -> list[np.ndarray | None]:
+    filename, flips = task
+    return [extract_landmarks(filename, flip) for flip in flips]
+
+
+def save_atomic(path: str, array: np.ndarray) -> None:
+    tmp_path = f"{path}.tmp.npy"
+    np.save(tmp_path, array)
+    # A crash never leaves a partially written file
+    os.replace(tmp_path, path)
+
+
+def extraction_parameters(min_detection_confidence: float, min_tracking_confidence: float) -> dict[str, Any]:
+    """
+    Everything that changes the extracted features, except the image and the flip
+    """
+    return {
+        "min_detection_confidence": min_detection_confidence,
+        "min_tracking_confidence": min_tracking_confidence,
+        "static_image_mode": True,
+        "max_num_hands": 1,
+        # Read without importing MediaPipe, the parent process doesn't need it
+        "mediapipe": version("mediapipe"),
+        "feature_schema": FEATURE_SCHEMA.version,
+    }
+
+
+def build_dataset(
+    tasks: list[Task],
+    cache_dir: str,
+    output: str,
+    workers: int,
+    flush_size: int = 500,
+    flips: tuple[bool, ...] = (True, False),
+    min_detection_confidence: float = 0.3,
+    min_tracking_confidence: float = 0.5,
+) -> np.ndarray:
+    cache = LandmarkCache(
+        cache_dir, extraction_parameters(min_detection_confidence, min_tracking_confidence), FEATURE_SCHEMA.n_features
+    )
+
+    start_time = time.perf_counter()
+    image_hashes = [file_hash(filename) for _, filename in tasks]
+    # Copies of an image are processed once
+    pending: dict[str, tuple[str, tuple[bool, ...]]] = {}
+    for (_, filename), image_hash in zip(tasks, image_hashes):
+        missing = tuple(flip for flip in flips if LandmarkCache.key(image_hash, flip) not in cache)
+        if missing and image_hash not in pending:
+            pending[image_hash] = (filename, missing)
+    print(
+        f"{len(tasks)} images hashed in {time.perf_counter() - start_time:.1f} s, "
+        f"{len(pending)} new or changed images to process, {len(cache)} landmarks cached"
+    )
+
+    if pending:
+        # Spawned workers don't inherit a MediaPipe graph or OpenCV threads of the parent
+        context = multiprocessing.get_context("spawn")
+        start_time = time.perf_counter()
+        processed = 0
+        try:
+            with context.Pool(workers, init_worker, (min_detection_confidence, min_tracking_confidence)) as pool:
+                results = pool.imap(extract_flips, pending.values(), chunksize=8)
+                for (image_hash, (_, image_flips)), image_features in zip(pending.items(), results):
+                    for flip, flip_features in zip(image_flips, image_features):
+                        cache.put(LandmarkCache.key(image_hash, flip), flip_features)
+                    processed += 1
+                    if processed % flush_size == 0 or processed == len(pending):
+                        # An interrupted build continues from here
+                        cache.flush()
+                        elapsed = time.perf_counter() - start_time
+                        print(f"{processed}/{len(pending)} images, {processed / elapsed:.1f} images/s")
+        finally:
+            # Images processed before a failed worker or Ctrl+C are kept too
+            cache.flush()
+        elapsed = time.perf_counter() - start_time
+        print(
+            f"Processed {processed} images in {elapsed:.1f} s with {workers} workers, {processed / elapsed:.1f} images/s"
+        )
+
+    rows = []
+    for (label, _), image_hash in zip(tasks, image_hashes):
+        for flip in flips:
+            features = cache.get(LandmarkCache.key(image_hash, flip))
+            if features is not None:
+                rows.append(np.append(features, label))
+    # Features and the label
+    dataset = np.array(rows, dtype=np.float64).reshape(-1, FEATURE_SCHEMA.n_features + 1)
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    save_atomic(output, dataset)
+    print(f"{len(dataset)} rows written to {output}")
+    return dataset
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Extract hand landmarks of the gesture images into processed.npy")
+    parser.add_argument("dataset_dir", nargs="?", default="dataset/", help="Directory with NN_label image directories")
+    parser.add_argument("output", nargs="?", default="data/processed.npy", help="Where to write the dataset")
+    parser.add_argument(
+        "--cache-dir",
+        default="data/landmark_cache",
+        help="Landmarks of the processed images, only new or changed images are processed again",
+    )
+    parser.add_argument("--class-size", type=int, default=1_000, help="Number of images sampled from every class")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the image sampling")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Number of worker processes")
+    parser.add_argument("--flush-size", type=int, default=500, help="Number of images between writes to the cache")
+    parser.add_argument("--no-flip", action="store_true", help="Don't add the rows of the mirrored images")
+    parser.add_argument("--min-detection-confidence", type=float, default=0.3)
+    parser.add_argument("--min-tracking-confidence", type=float, default=0.5)
+    args = parser.parse_args()
+
+    build_dataset(
+        dataset_files(args.dataset_dir, args.class_size, args.seed),
+        args.cache_dir,
+        args.output,
+        args.workers,
+        args.flush_size,
+        (False,) if args.no_flip else (True, False),
+        args.min_detection_confidence,
+        args.min_tracking_confidence,
+    )
+
+
+if __name__ == "__main__":
+    main()
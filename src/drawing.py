@@ -1,52 +1,99 @@
+from collections.abc import Iterable
+from typing import TYPE_CHECKING
+
 import cv2
-import mediapipe as mp
 import numpy as np
-from mediapipe.framework.formats.classification_pb2 import ClassificationList
-from mediapipe.framework.formats.landmark_pb2 import NormalizedLandmarkList
 
+# MediaPipe is slow to import, it is needed only for the annotations here
+if TYPE_CHECKING:
+    from mediapipe.framework.formats.classification_pb2 import ClassificationList
+    from mediapipe.framework.formats.landmark_pb2 import NormalizedLandmarkList
 
-def calc_bounding_rect(image: np.ndarray, landmarks: NormalizedLandmarkList) -> tuple[int, int, int, int]:
-    image_width, image_height = image.shape[1], image.shape[0]
+# mp.solutions.hands.HandLandmark.WRIST
+WRIST = 0
+
+
+def landmarks_to_array(landmarks: "NormalizedLandmarkList", out: np.ndarray | None = None) -> np.ndarray:
+    """
+    Convert landmarks to a (21, 3) float32 array of x, y, z, optionally writing into a preallocated `out`
+    """
+    landmark_list = landmarks.landmark
+    if out is None:
+        out = np.empty((len(landmark_list), 3), dtype=np.float32)
+    out[:] = [(landmark.x, landmark.y, landmark.z) for landmark in landmark_list]
+    return out
 
-    landmark_array = np.empty((0, 2), int)
 
-    for _, landmark in enumerate(landmarks.landmark):
-        landmark_x = min(int(landmark.x * image_width), image_width - 1)
-        landmark_y = min(int(landmark.y * image_height), image_height - 1)
+def as_landmark_array(landmarks: "NormalizedLandmarkList | np.ndarray") -> np.ndarray:
+    if isinstance(landmarks, np.ndarray):
+        return landmarks
+    return landmarks_to_array(landmarks)
 
-        landmark_point = [np.array((landmark_x, landmark_y))]
 
-        landmark_array = np.append(landmark_array, landmark_point, axis=0)
+def calc_bounding_rect(
+    image: np.ndarray, landmarks: "NormalizedLandmarkList | np.ndarray"
+) -> tuple[int, int, int, int]:
+    image_width, image_height = image.shape[1], image.shape[0]
 
-    x, y, w, h = cv2.boundingRect(landmark_array)
+    landmark_array = as_landmark_array(landmarks)
+    # Landmarks are normalized to the detector input, which keeps the frame aspect ratio,
+    # so they map to any resolution of the same frame
+    points = (landmark_array[:, :2] * (image_width, image_height)).astype(np.int32)
+    np.minimum(points, (image_width - 1, image_height - 1), out=points)
 
-    return x, y, x + w, y + h
+    x, y = points.min(axis=0)
+    x_max, y_max = points.max(axis=0)
 
+    return int(x), int(y), int(x_max) + 1, int(y_max) + 1
 
-def calc_landmark_list(landmarks: NormalizedLandmarkList) -> np.ndarray:
-    landmark_list = landmarks.landmark
-    # Get the position of the wrist landmark (Landmark.WRIST)
-    wrist_position_x, wrist_position_y = (
-        landmark_list[mp.solutions.hands.HandLandmark.WRIST].x,
-        landmark_list[mp.solutions.hands.HandLandmark.WRIST].y,
-    )
 
-    # Normalize the landmarks relative to the wrist position
-    normalized_landmarks = [
-        (landmark.x - wrist_position_x, landmark.y - wrist_position_y) for landmark in landmark_list  # landmark.z
-    ]
-    normalized_landmarks = np.array(normalized_landmarks).flatten()
-    normalized_landmarks /= max(abs(normalized_landmarks))
+def calc_landmark_batch(landmark_arrays: np.ndarray) -> np.ndarray:
+    """
+    Features of (N, 21, 3) landmark arrays: x, y relative to the wrist scaled by the max absolute value, (N, 42)
+    """
+    # Computed in float64 like the features of the training dataset
+    coordinates = landmark_arrays[..., :2].astype(np.float64)
+    coordinates -= coordinates[:, WRIST, np.newaxis, :]
+    normalized_landmarks = coordinates.reshape(len(coordinates), -1)
+    normalized_landmarks /= np.abs(normalized_landmarks).max(axis=1, keepdims=True)
     return normalized_landmarks
 
 
+def calc_landmark_list(landmarks: "NormalizedLandmarkList | np.ndarray") -> np.ndarray:
+    return np.asarray(calc_landmark_batch(as_landmark_array(landmarks)[np.newaxis])[0], dtype=np.float64)
+
+
+def draw_landmarks(
+    image: np.ndarray, landmark_array: np.ndarray, connections: "Iterable[tuple[int, int]]"
+) -> np.ndarray:
+    """
+    Same as mp.solutions.drawing_utils.draw_landmarks with the default style, but for a (21, 3) landmark array
+    """
+    image_width, image_height = image.shape[1], image.shape[0]
+    points = landmark_array[:, :2]
+    # Landmarks outside the image are not drawn
+    visible = np.all((points >= 0) & (points <= 1), axis=1)
+    pixels = np.floor(np.where(visible[:, np.newaxis], points, 0) * (image_width, image_height)).astype(np.int32)
+    np.minimum(pixels, (image_width - 1, image_height - 1), out=pixels)
+    pixel_list = [(x, y) for x, y in pixels.tolist()]
+    for start, end in connections:
+        if visible[start] and visible[end]:
+            cv2.line(image, pixel_list[start], pixel_list[end], (224, 224, 224), 2)
+    # Points over the lines, a red dot with a white border
+    for pixel, is_visible in zip(pixel_list, visible):
+        if is_visible:
+            cv2.circle(image, pixel, 3, (224, 224, 224), 2)
+            cv2.circle(image, pixel, 2, (0, 0, 255), 2)
+    return image
+
+
 def draw_bounding_rect(image: np.ndarray, brect: list[int]) -> np.ndarray:
     cv2.rectangle(image, (brect[0], brect[1]), (brect[2], brect[3]), (0, 0, 0), 1)
     return image
 
 
 def draw_info_text(
-    image: np.ndarray, brect: tuple[int, int, int, int], handedness: ClassificationList, hand_sign_text: str
+    image: np.ndarray, brect: tuple[int, int, int, int], handedness: "ClassificationList", hand_sign_text: str
 ) -> np.ndarray:
     cv2.rectangle(image, (brect[0], brect[1]), (brect[2], brect[1] - 22), (0, 0, 0), -1)
 
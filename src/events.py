@@ -0,0 +1,98 @@
+import threading
+from collections.abc import Callable
+from dataclasses import dataclass
+from enum import Enum
+
+
+class EventKind(str, Enum):
+    key = "key"
+    mouse = "mouse"
+    lost = "lost"
+
+
+@dataclass
+class HandEvent:
+    kind: EventKind
+    hand_id: int
+    label: str = ""
+    dx: int = 0
+    dy: int = 0
+
+
+class GestureEvents:
+    """
+    Gesture events of the recognition thread for the GUI thread. Only changes are kept: a new gesture of a hand,
+    a cursor movement or a lost hand. Events are collected until the GUI takes them, consecutive movements
+    of a hand are merged into one, and `notify` is called once per batch, so the Qt event queue holds
+    at most one pending notification however busy the GUI is.
+    """
+
+    def __init__(self, notify: Callable[[], None]) -> None:
+        self.notify = notify
+        self._lock = threading.Lock()
+        self._pending: list[HandEvent] = []
+        # Last gesture of every hand that was passed to the GUI
+        self._labels: dict[int, str] = {}
+        self._notified = False
+        self.emitted = 0
+        self.suppressed = 0
+        self.coalesced = 0
+        # Events taken by the GUI, after suppression and merging, by kind
+        self.taken = {kind: 0 for kind in EventKind}
+
+    def _add(self, event: HandEvent) -> None:
+        with self._lock:
+            self._pending.append(event)
+            self.emitted += 1
+            notify = not self._notified
+            self._notified = True
+        # Outside of the lock, a directly connected receiver takes the events right away
+        if notify:
+            self.notify()
+
+    def key(self, hand_id: int, label: str) -> None:
+        with self._lock:
+            if self._labels.get(hand_id) == label:
+                self.suppressed += 1
+                return
+            self._labels[hand_id] = label
+        self._add(HandEvent(EventKind.key, hand_id, label))
+
+    def mouse(self, hand_id: int, label: str, dx: int, dy: int) -> None:
+        with self._lock:
+            if self._labels.get(hand_id) == label:
+                if dx == 0 and dy == 0:
+                    self.suppressed += 1
+                    return
+                last = next((event for event in reversed(self._pending) if event.hand_id == hand_id), None)
+                if last is not None and last.kind == EventKind.mouse and last.label == label:
+                    last.dx += dx
+                    last.dy += dy
+                    self.coalesced += 1
+                    return
+            self._labels[hand_id] = label
+        self._add(HandEvent(EventKind.mouse, hand_id, label, dx, dy))
+
+    def lost(self, hand_id: int) -> None:
+        with self._lock:
+            self._labels.pop(hand_id, None)
+        self._add(HandEvent(EventKind.lost, hand_id))
+
+    def take(self) -> list[HandEvent]:
+        """
+        Called from the GUI thread, returns the collected events in order
+        """
+        with self._lock:
+            events, self._pending = self._pending, []
+            self._notified = False
+            for event in events:
+                self.taken[event.kind] += 1
+        return events
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "emitted": self.emitted,
+            "suppressed": self.suppressed,
+            "coalesced": self.coalesced,
+            **{f"{kind.value}_events": count for kind, count in self.taken.items()},
+        }
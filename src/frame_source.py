@@ -0,0 +1,126 @@
+import os
+import time
+from abc import ABC, abstractmethod
+from enum import Enum
+
+import cv2
+import numpy as np
+
+
+class Pacing(str, Enum):
+    realtime = "realtime"
+    fast = "fast"
+
+
+class FrameSource(ABC):
+    """
+    Source of BGR frames for the capture stage
+    """
+
+    # Nominal frame rate
+    fps: float
+
+    @abstractmethod
+    def read(self, out: np.ndarray | None = None) -> np.ndarray | None:
+        """
+        Return the next frame or None when the source is exhausted.
+        The frame is decoded into `out` when the source supports it and the size matches.
+        """
+
+    def release(self) -> None:
+        pass
+
+
+class CameraSource(FrameSource):
+    def __init__(self, device: int) -> None:
+        self.cap = cv2.VideoCapture(device)
+        # Cameras that don't report it are assumed to run at 30 fps
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+
+    def read(self, out: np.ndarray | None = None) -> np.ndarray | None:
+        ret, image = self.cap.read(out)
+        return image if ret else None
+
+    def release(self) -> None:
+        self.cap.release()
+
+
+class PacedSource(FrameSource):
+    """
+    Recorded source that either replays at its frame rate or returns frames as fast as possible
+    """
+
+    def __init__(self, fps: float, pacing: Pacing) -> None:
+        self.fps = fps
+        self.pacing = pacing
+        self.frame_count = 0
+        self.start_time: float | None = None
+
+    def wait_next_frame(self) -> None:
+        if self.pacing == Pacing.fast:
+            return
+        if self.start_time is None:
+            self.start_time = time.perf_counter()
+        delay = self.start_time + self.frame_count / self.fps - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+    @abstractmethod
+    def read_frame(self, out: np.ndarray | None = None) -> np.ndarray | None:
+        pass
+
+    def read(self, out: np.ndarray | None = None) -> np.ndarray | None:
+        self.wait_next_frame()
+        image = self.read_frame(out)
+        if image is not None:
+            self.frame_count += 1
+        return image
+
+
+class VideoFileSource(PacedSource):
+    def __init__(self, path: str, pacing: Pacing = Pacing.realtime, fps: float | None = None) -> None:
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise FileNotFoundError(f"Can't open video {path}")
+        super().__init__(fps or self.cap.get(cv2.CAP_PROP_FPS) or 30.0, pacing)
+
+    def read_frame(self, out: np.ndarray | None = None) -> np.ndarray | None:
+        ret, image = self.cap.read(out)
+        return image if ret else None
+
+    def release(self) -> None:
+        self.cap.release()
+
+
+class ImageDirectorySource(PacedSource):
+    extensions = (".jpg", ".jpeg", ".png", ".bmp")
+
+    def __init__(self, path: str, pacing: Pacing = Pacing.realtime, fps: float | None = None) -> None:
+        super().__init__(fps or 30.0, pacing)
+        self.files = sorted(
+            os.path.join(path, file_name)
+            for file_name in os.listdir(path)
+            if file_name.lower().endswith(self.extensions)
+        )
+        if len(self.files) == 0:
+            raise FileNotFoundError(f"No images in {path}")
+        self.position = 0
+
+    def read_frame(self, out: np.ndarray | None = None) -> np.ndarray | None:
+        # cv2.imread always allocates
+        while self.position < len(self.files):
+            image = cv2.imread(self.files[self.position])
+            self.position += 1
+            if image is not None:
+                return image
+        return None
+
+
+def open_frame_source(
+    device: int, source: str | None = None, pacing: Pacing = Pacing.realtime, fps: float | None = None
+) -> FrameSource:
+    if source is None:
+        return CameraSource(device)
+    if os.path.isdir(source):
+        return ImageDirectorySource(source, pacing, fps)
+    return VideoFileSource(source, pacing, fps)
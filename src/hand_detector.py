@@ -0,0 +1,102 @@
+from enum import Enum
+from typing import Any
+
+import cv2
+import numpy as np
+
+
+class HandsMode(str, Enum):
+    video = "video"
+    image = "image"
+
+
+class HandDetector:
+    """
+    Wrapper around MediaPipe Hands with detection counters.
+
+    In video mode MediaPipe tracks hands from the previous frame's landmarks and runs palm detection
+    only while fewer than `max_num_hands` hands are tracked, a hand is dropped from tracking when its
+    confidence falls below `min_tracking_confidence`. Image mode runs palm detection on every frame.
+    MediaPipe doesn't report which frames were detected, so the counters are derived from the number
+    of returned hands: `hand_reappearances` counts video frames with more hands than the previous one.
+
+    With `inference_width` frames are downscaled before detection keeping their aspect ratio.
+    Landmarks are normalized to the image size, so they stay valid for the full resolution frame.
+    """
+
+    def __init__(
+        self,
+        mode: HandsMode = HandsMode.video,
+        max_num_hands: int = 1,
+        min_detection_confidence: float = 0.7,
+        min_tracking_confidence: float = 0.5,
+        inference_width: int | None = None,
+    ) -> None:
+        self.inference_width = inference_width
+        self._inference_buffer: np.ndarray | None = None
+        self.max_num_hands = max_num_hands
+        self.min_detection_confidence = min_detection_confidence
+        self.min_tracking_confidence = min_tracking_confidence
+
+        # Frames where palm detection ran, frames served by tracking only and frames where a hand came back
+        self.detection_frames = 0
+        self.tracking_frames = 0
+        self.hand_reappearances = 0
+        self._tracked_hands = 0
+
+        self.mode = mode
+        self.hands = self._create_hands()
+
+    def _create_hands(self) -> Any:
+        # Imported here, so the configuration can use HandsMode without loading MediaPipe
+        import mediapipe as mp
+
+        return mp.solutions.hands.Hands(
+            static_image_mode=self.mode == HandsMode.image,
+            max_num_hands=self.max_num_hands,
+            min_detection_confidence=self.min_detection_confidence,
+            min_tracking_confidence=self.min_tracking_confidence,
+        )
+
+    def set_mode(self, mode: HandsMode) -> None:
+        if mode == self.mode:
+            return
+        self.hands.close()
+        self.mode = mode
+        self.hands = self._create_hands()
+        self._tracked_hands = 0
+
+    def inference_image(self, image: np.ndarray) -> np.ndarray:
+        height, width = image.shape[:2]
+        if self.inference_width is None or width <= self.inference_width:
+            return image
+        inference_height = max(1, round(height * self.inference_width / width))
+        # MediaPipe copies its input, so one buffer is reused for all frames
+        self._inference_buffer = cv2.resize(
+            image, (self.inference_width, inference_height), dst=self._inference_buffer, interpolation=cv2.INTER_AREA
+        )
+        return self._inference_buffer
+
+    def process(self, image: np.ndarray) -> Any:
+        if self.mode == HandsMode.image or self._tracked_hands < self.max_num_hands:
+            self.detection_frames += 1
+        else:
+            self.tracking_frames += 1
+
+        results = self.hands.process(self.inference_image(image))
+
+        hands_count = 0 if results.multi_hand_landmarks is None else len(results.multi_hand_landmarks)
+        if self.mode == HandsMode.video and hands_count > self._tracked_hands:
+            self.hand_reappearances += 1
+        self._tracked_hands = hands_count
+        return results
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "detection_frames": self.detection_frames,
+            "tracking_frames": self.tracking_frames,
+            "hand_reappearances": self.hand_reappearances,
+        }
+
+    def close(self) -> None:
+        self.hands.close()
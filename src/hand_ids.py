@@ -0,0 +1,40 @@
+import numpy as np
+
+
+class HandIdTracker:
+    """
+    Gives every hand an id that stays the same between frames.
+    Hands are greedily matched to the nearest hand of the previous frame by the landmark centroid,
+    hands farther than `max_distance` (in normalized image coordinates) get a new id.
+    """
+
+    def __init__(self, max_distance: float = 0.25) -> None:
+        self.max_distance = max_distance
+        self.positions: dict[int, np.ndarray] = {}
+        self.lost_ids: list[int] = []
+        self._next_id = 0
+
+    def update(self, landmark_arrays: np.ndarray) -> list[int]:
+        centroids = landmark_arrays[:, :, :2].mean(axis=1)
+        previous_ids = list(self.positions)
+        ids: list[int | None] = [None] * len(centroids)
+
+        if previous_ids and len(centroids):
+            previous = np.stack([self.positions[hand_id] for hand_id in previous_ids])
+            distances = np.linalg.norm(centroids[:, np.newaxis] - previous[np.newaxis], axis=2)
+            for flat_index in np.argsort(distances, axis=None):
+                hand, previous_hand = np.unravel_index(flat_index, distances.shape)
+                if distances[hand, previous_hand] > self.max_distance:
+                    break
+                if ids[hand] is None and previous_ids[previous_hand] not in ids:
+                    ids[hand] = previous_ids[previous_hand]
+
+        for hand, hand_id in enumerate(ids):
+            if hand_id is None:
+                ids[hand] = self._next_id
+                self._next_id += 1
+
+        matched_ids = [int(hand_id) for hand_id in ids if hand_id is not None]
+        self.lost_ids = [hand_id for hand_id in previous_ids if hand_id not in matched_ids]
+        self.positions = dict(zip(matched_ids, centroids))
+        return matched_ids
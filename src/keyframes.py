@@ -0,0 +1,192 @@
+import math
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, NamedTuple
+
+import cv2
+import numpy as np
+from mediapipe.framework.formats.classification_pb2 import ClassificationList
+
+from src.drawing import landmarks_to_array
+from src.hand_detector import HandDetector
+
+
+class HandResults(NamedTuple):
+    """
+    Same fields as the MediaPipe Hands output, used for frames with predicted landmarks.
+    The landmarks are a (n_hands, 21, 3) array instead of a list of NormalizedLandmarkList.
+    """
+
+    multi_hand_landmarks: np.ndarray | None
+    multi_handedness: list[ClassificationList] | None
+    multi_hand_world_landmarks: None = None
+
+
+class KeyframeScheduler:
+    """
+    Decides on which frames the hand detector runs: every `interval`-th frame, on motion since the previous
+    frame, or while no hand is known. `interval=0` picks the interval from the measured detection latency
+    so that predicted frames keep up with `target_fps`, the frame rate of the source.
+    """
+
+    thumbnail_size = (32, 24)
+
+    def __init__(
+        self,
+        interval: int = 1,
+        max_interval: int = 4,
+        target_fps: float = 30.0,
+        motion_threshold: float = 4.0,
+    ) -> None:
+        self.interval = interval
+        self.max_interval = max_interval
+        self.target_fps = target_fps
+        self.motion_threshold = motion_threshold
+
+        self.detection_time = 0.0
+        self._frames_since_keyframe = 0
+        self._previous_thumbnail: np.ndarray | None = None
+
+    @property
+    def current_interval(self) -> int:
+        if self.interval > 0:
+            return self.interval
+        return max(1, min(self.max_interval, math.ceil(self.detection_time * self.target_fps)))
+
+    def has_motion(self, thumbnail: np.ndarray) -> bool:
+        if self._previous_thumbnail is None:
+            return True
+        return float(cv2.absdiff(thumbnail, self._previous_thumbnail).mean()) > self.motion_threshold
+
+    def should_detect(self, image: np.ndarray, has_hands: bool, busy: bool = False) -> bool:
+        """
+        `busy` frames arrive while a keyframe is still being detected, they only count toward the interval
+        """
+        interval = self.current_interval
+        if interval == 1:
+            return True
+
+        # Downscaled first, so only the thumbnail is converted to gray
+        thumbnail = cv2.cvtColor(
+            cv2.resize(image, self.thumbnail_size, interpolation=cv2.INTER_AREA), cv2.COLOR_RGB2GRAY
+        )
+        self._frames_since_keyframe += 1
+        has_motion = self.has_motion(thumbnail)
+        # Compared with the previous frame, a slow drift is caught by the interval
+        self._previous_thumbnail = thumbnail
+        if busy:
+            return False
+        if not has_hands or self._frames_since_keyframe >= interval or has_motion:
+            self._frames_since_keyframe = 0
+            return True
+        return False
+
+    def record_detection(self, seconds: float) -> None:
+        # Exponential moving average of the detection latency
+        self.detection_time = seconds if self.detection_time == 0 else 0.8 * self.detection_time + 0.2 * seconds
+
+
+class LandmarkPredictor:
+    """
+    Extrapolates the landmarks of the last keyframe with the velocity between the last two keyframes
+    """
+
+    def __init__(self, max_horizon: float = 0.2) -> None:
+        self.max_horizon = max_horizon
+        self.handedness: list[ClassificationList] | None = None
+        self._landmarks: np.ndarray | None = None
+        self._velocity: np.ndarray | None = None
+        self._timestamp = 0.0
+
+    @property
+    def has_hands(self) -> bool:
+        return self._landmarks is not None
+
+    def update(self, results: Any, timestamp: float) -> None:
+        if results.multi_hand_landmarks is None:
+            self._landmarks = self._velocity = None
+            self.handedness = None
+            return
+
+        landmarks = np.empty((len(results.multi_hand_landmarks), 21, 3), dtype=np.float32)
+        for hand, out in zip(results.multi_hand_landmarks, landmarks):
+            landmarks_to_array(hand, out)
+        dt = timestamp - self._timestamp
+        if self._landmarks is not None and self._landmarks.shape == landmarks.shape and dt > 0:
+            self._velocity = (landmarks - self._landmarks) / dt
+        else:
+            self._velocity = np.zeros_like(landmarks)
+        self._landmarks = landmarks
+        self.handedness = list(results.multi_handedness)
+        self._timestamp = timestamp
+
+    def predict(self, timestamp: float) -> HandResults:
+        if self._landmarks is None or self._velocity is None:
+            return HandResults(None, None)
+
+        dt = min(timestamp - self._timestamp, self.max_horizon)
+        # Passed on as an array, the classifier and the preview don't need MediaPipe landmark lists
+        return HandResults(self._landmarks + self._velocity * dt, self.handedness)
+
+
+class KeyframeDetector:
+    """
+    Runs the hand detector on keyframes only and predicts landmarks for the frames in between.
+    With an interval above 1 detection runs in its own thread: frames arriving while MediaPipe is busy
+    get predicted landmarks right away, and a finished keyframe updates the predictor on the next frame.
+    With interval 1 every frame is detected in the calling thread.
+    """
+
+    def __init__(self, detector: HandDetector, scheduler: KeyframeScheduler, predictor: LandmarkPredictor) -> None:
+        self.detector = detector
+        self.scheduler = scheduler
+        self.predictor = predictor
+        self.keyframes = 0
+        self.predicted_frames = 0
+        self._executor = ThreadPoolExecutor(1, "keyframe-detector")
+        # Detection running in the executor: its results and the timestamp of its frame
+        self._pending: Future[tuple[Any, float]] | None = None
+
+    def detect(self, image: np.ndarray, timestamp: float) -> tuple[Any, float]:
+        start_time = time.perf_counter()
+        results = self.detector.process(image)
+        self.scheduler.record_detection(time.perf_counter() - start_time)
+        return results, timestamp
+
+    def update(self, wait: bool) -> None:
+        """
+        Passes a finished detection to the predictor, errors of the detector are raised here
+        """
+        if self._pending is None or not (wait or self._pending.done()):
+            return
+        results, timestamp = self._pending.result()
+        self._pending = None
+        self.predictor.update(results, timestamp)
+        self.keyframes += 1
+
+    def process(self, image: np.ndarray, timestamp: float) -> Any:
+        if self.scheduler.current_interval == 1:
+            # The detector is never used from two threads at once
+            self.update(wait=True)
+            results, _ = self.detect(image, timestamp)
+            self.predictor.update(results, timestamp)
+            self.keyframes += 1
+            return results
+
+        self.update(wait=False)
+        if self.scheduler.should_detect(image, self.predictor.has_hands, busy=self._pending is not None):
+            # The frame goes back to the pool once this packet is done, MediaPipe gets a copy
+            self._pending = self._executor.submit(self.detect, image.copy(), timestamp)
+        self.predicted_frames += 1
+        return self.predictor.predict(timestamp)
+
+    def close(self) -> None:
+        self._executor.shutdown()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            **self.detector.stats(),
+            "keyframes": self.keyframes,
+            "predicted_frames": self.predicted_frames,
+            "keyframe_interval": self.scheduler.current_interval,
+        }
@@ -1,4 +1,9 @@
+import atexit
 import logging
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
 
 
 class Logger(logging.Formatter):
@@ -16,21 +21,95 @@ class Logger(logging.Formatter):
         logging.DEBUG: white + _format + reset,
         logging.WARNING: yellow + _format + reset,
         logging.INFO: blue + _format + reset,
+        logging.ERROR: red + _format + reset,
+        logging.CRITICAL: red + _format + reset,
     }
 
+    def __init__(self) -> None:
+        super().__init__(self._format)
+        self.formatters = {level: logging.Formatter(log_fmt) for level, log_fmt in self.formats.items()}
+
     def format(self, record: logging.LogRecord) -> str:
-        log_fmt = self.formats.get(record.levelno)
-        formatter = logging.Formatter(log_fmt)
+        formatter = self.formatters.get(record.levelno)
+        if formatter is None:
+            return super().format(record)
         return formatter.format(record)
 
 
+class RateLimitFilter(logging.Filter):
+    """
+    Lets through at most `rate` records of every logging call site per `period` seconds.
+    The number of dropped records is added to the first record of the next period.
+    """
+
+    def __init__(self, rate: int = 5, period: float = 1.0) -> None:
+        super().__init__()
+        self.rate = rate
+        self.period = period
+        # Call site -> start of the period, records in the period, suppressed records
+        self._windows: dict[tuple[str, int], list[float]] = {}
+        self._lock = threading.Lock()
+        self.suppressed = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.period:
+                suppressed = 0 if window is None else int(window[2])
+                self._windows[key] = [now, 1, 0]
+                if suppressed:
+                    record.msg = f"{record.msg} ({suppressed} similar messages suppressed)"
+                return True
+            if window[1] < self.rate:
+                window[1] += 1
+                return True
+            window[2] += 1
+            self.suppressed += 1
+            return False
+
+
+class LazyQueueHandler(QueueHandler):
+    """
+    Puts records to the queue without formatting them, the message is built in the writer thread
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+_lock = threading.Lock()
+_queue_handler: LazyQueueHandler | None = None
+
+
+def _get_queue_handler() -> LazyQueueHandler:
+    """
+    Shared handler of all loggers, records are written to the terminal by one background thread
+    """
+    global _queue_handler
+    with _lock:
+        if _queue_handler is None:
+            log_queue: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+            console_handler = logging.StreamHandler()
+            console_handler.setFormatter(Logger())
+            listener = QueueListener(log_queue, console_handler, respect_handler_level=True)
+            listener.start()
+            # Write the records left in the queue on exit
+            atexit.register(listener.stop)
+
+            _queue_handler = LazyQueueHandler(log_queue)
+            _queue_handler.addFilter(RateLimitFilter())
+        return _queue_handler
+
+
 def get_logger(name: str, level: int = logging.DEBUG) -> logging.Logger:
     logger = logging.getLogger(name)
     logger.setLevel(level)
     logger.propagate = False
 
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(level)
-    console_handler.setFormatter(Logger())
-    logger.addHandler(console_handler)
+    queue_handler = _get_queue_handler()
+    # Loggers are shared by name, so the handler is added only once
+    if queue_handler not in logger.handlers:
+        logger.addHandler(queue_handler)
     return logger
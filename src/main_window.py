@@ -3,36 +3,43 @@ import os
 from collections import defaultdict
 
 from pynput import keyboard
-from PySide6 import QtGui
-from PySide6.QtCore import QPointList, Slot
+from PySide6 import QtCore, QtGui
+from PySide6.QtCore import Slot
 from PySide6.QtGui import QImage, QPixmap
 from PySide6.QtWidgets import QMainWindow
 
+from src.actuator import Actuator
+from src.config import RecognitionConfig
 from src.dialog_window import DialogWindow
+from src.events import EventKind
 from src.logger import get_logger
-from src.process_keyboard.keyboard_press import button_hook, keys_to_str, press_keyboard
-from src.process_mouse.move_mouse import action_mouse, move_mouse
+from src.metrics import StartupTimings
+from src.process_keyboard.keyboard_press import button_hook, keys_to_str
 from src.thread import Thread
 from src.ui.main_window_ui import Ui_MainWindow
 
 
 class MainWindow(QMainWindow):
-    prev_label = None
-
-    def __init__(self, file_name: str, device: int) -> None:
+    def __init__(self, file_name: str, config: RecognitionConfig, startup: StartupTimings | None = None) -> None:
         super().__init__()
         self.logger = get_logger(self.__class__.__name__)
 
         self.ui = Ui_MainWindow()
         self.ui.setupUi(self)
         self.file_name = file_name
-
-        self.th = Thread(device, self)
+        # Last gesture of every hand, hands are identified by the id from the capture thread
+        self.prev_labels: dict[int, str] = {}
+        # The cursor is controlled by one hand: the first hand showing a mouse gesture, until it shows a key
+        # gesture or is lost. Mouse gestures of the other hands are ignored, keys are pressed for every hand.
+        self.cursor_hand_id: int | None = None
+
+        self.th = Thread(config, self, startup)
+        # Keyboard and mouse input is injected from its own thread
+        self.actuator = Actuator(self.th.timings)
+        self.th.metrics.add_gauge("actuator", self.actuator.stats)
         self.th.finished.connect(self.close)
         self.th.update_frame.connect(self.set_image)
-        self.th.activate_key.connect(self.process_key)
-        self.th.mouse_move.connect(self.process_mouse)
-        self.th.update_label.connect(self.update_label)
+        self.th.events_ready.connect(self.process_events)
 
         self.ui.one_combobox.currentTextChanged.connect(
             lambda text: self.combo_changed(text, combo_name="one_combobox")
@@ -76,8 +83,29 @@ class MainWindow(QMainWindow):
         self.start()
 
     @Slot()
-    def update_label(self):
-        self.prev_label = None
+    def process_events(self) -> None:
+        for event in self.th.events.take():
+            match event.kind:
+                case EventKind.key:
+                    self.process_key(event.hand_id, event.label)
+                case EventKind.mouse:
+                    self.process_mouse(event.hand_id, event.label, event.dx, event.dy)
+                case EventKind.lost:
+                    self.update_label(event.hand_id)
+
+    def update_label(self, hand_id: int) -> None:
+        # The hand is gone, don't leave its mouse button pressed
+        self.release_cursor(hand_id)
+        self.prev_labels.pop(hand_id, None)
+
+    def release_cursor(self, hand_id: int) -> None:
+        if hand_id != self.cursor_hand_id:
+            return
+        self.cursor_hand_id = None
+        prev_label = self.prev_labels.get(hand_id)
+        if prev_label in self.mouse_gestures:
+            self.logger.info("Hand %d: %s release mouse", hand_id, prev_label)
+            self.actuator.action_mouse(self.mouse_values[self.current_profile], prev_label, is_start=False)
 
     def change_profile(self, profile_name: str):
         self.current_profile = profile_name
@@ -90,9 +118,11 @@ class MainWindow(QMainWindow):
         self.logger.info("Finishing thread...")
         self.th.status = False
         self.th.wait()  # Wait for the thread to finish
+        self.actuator.stop()
 
     def start(self) -> None:
         self.logger.info("Starting thread...")
+        self.actuator.start()
         self.th.start()
 
     def process_buttons(self) -> None:
@@ -102,22 +132,38 @@ class MainWindow(QMainWindow):
     @Slot(QImage)
     def set_image(self, image: QImage) -> None:
         self.ui.label_5.setPixmap(QPixmap.fromImage(image))
+        # The pixmap owns a copy now, the buffer behind the image can be reused
+        self.th.preview_shown()
+
+    def update_preview_visibility(self) -> None:
+        # A minimized window still counts as visible for Qt
+        self.th.set_preview_visible(self.ui.label_5.isVisible() and not self.isMinimized())
+
+    def showEvent(self, event: QtGui.QShowEvent) -> None:
+        super().showEvent(event)
+        self.update_preview_visibility()
 
-    @Slot(str)
-    def process_key(self, label: str) -> None:
-        if self.prev_label in self.mouse_gestures:
-            self.logger.info(f"Mouse gesture: {self.prev_label} release mouse")
-            action_mouse(self.mouse_values[self.current_profile], self.prev_label, is_start=False)
+    def hideEvent(self, event: QtGui.QHideEvent) -> None:
+        super().hideEvent(event)
+        self.update_preview_visibility()
 
-        self.logger.info(f"Label: {label} key: {self.key_values[self.current_profile][label]}")
+    def changeEvent(self, event: QtCore.QEvent) -> None:
+        super().changeEvent(event)
+        if event.type() == QtCore.QEvent.WindowStateChange:
+            self.update_preview_visibility()
 
-        if self.prev_label == label or len(self.key_values[self.current_profile][label]) == 0:
-            self.prev_label = label
+    def process_key(self, hand_id: int, label: str) -> None:
+        self.release_cursor(hand_id)
+        prev_label = self.prev_labels.get(hand_id)
+
+        self.logger.debug("Hand %d label: %s key: %s", hand_id, label, self.key_values[self.current_profile][label])
+
+        self.prev_labels[hand_id] = label
+        if prev_label == label or len(self.key_values[self.current_profile][label]) == 0:
             return
-        self.prev_label = label
         try:
-            self.logger.info(f"Pressing {keys_to_str(self.key_values[self.current_profile][label])}")
-            press_keyboard(self.key_values[self.current_profile][label])
+            self.logger.info("Pressing %s", keys_to_str(self.key_values[self.current_profile][label]))
+            self.actuator.press_keys(self.key_values[self.current_profile][label])
         except Exception as err:
             self.logger.error(err)
 
@@ -127,21 +173,29 @@ class MainWindow(QMainWindow):
             text = dlg.ui.textEdit.toPlainText()
             self.ui.profile_combobox.addItem(text)
             self.ui.profile_combobox.setCurrentText(text)
-            self.logger.info(f"Adding profile {text}")
-
-    @Slot(str, QPointList)
-    def process_mouse(self, label: str, point_history: QPointList) -> None:
-        self.logger.info(f"Label: {label}")
-
-        if self.prev_label != label:
-            if self.prev_label in self.mouse_gestures:
-                self.logger.info(f"Mouse gesture: {self.prev_label} release mouse")
-                action_mouse(self.mouse_values[self.current_profile], self.prev_label, is_start=False)
+            self.logger.info("Adding profile %s", text)
+
+    def process_mouse(self, hand_id: int, label: str, dx: int, dy: int) -> None:
+        self.logger.debug("Hand %d label: %s", hand_id, label)
+
+        prev_label = self.prev_labels.get(hand_id)
+        self.prev_labels[hand_id] = label
+        if self.cursor_hand_id is None:
+            self.logger.info("Hand %d controls the cursor", hand_id)
+            self.cursor_hand_id = hand_id
+            # Mouse gestures of the hand were ignored until now, nothing is pressed
+            prev_label = None
+        elif hand_id != self.cursor_hand_id:
+            self.logger.debug("Hand %d ignored, hand %d controls the cursor", hand_id, self.cursor_hand_id)
+            return
+        if prev_label != label:
+            if prev_label in self.mouse_gestures:
+                self.logger.info("Mouse gesture: %s release mouse", prev_label)
+                self.actuator.action_mouse(self.mouse_values[self.current_profile], prev_label, is_start=False)
             if label in self.mouse_gestures:
-                self.logger.info(f"Mouse gesture: {label} start mouse")
-                action_mouse(self.mouse_values[self.current_profile], label)
-        move_mouse(self.mouse_values[self.current_profile], point_history, label)
-        self.prev_label = label
+                self.logger.info("Mouse gesture: %s start mouse", label)
+                self.actuator.action_mouse(self.mouse_values[self.current_profile], label)
+        self.actuator.move_mouse(self.mouse_values[self.current_profile], label, dx, dy)
 
     def closeEvent(self, event: QtGui.QCloseEvent) -> None:
         self.kill_thread()
@@ -194,8 +248,8 @@ class MainWindow(QMainWindow):
         self.ui.profile_combobox.setCurrentText(profiles[0])
         self.update_gestures_text()
         self.logger.info("Config read")
-        self.logger.info(self.mouse_values)
-        self.logger.info(self.key_values)
+        self.logger.debug("Mouse keymap: %s", self.mouse_values)
+        self.logger.debug("Keyboard keymap: %s", self.key_values)
 
     def read_keymap(
         self, keymap_json: dict[str, str]
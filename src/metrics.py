@@ -0,0 +1,241 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+import numpy as np
+
+
+class LatencyHistogram:
+    """
+    Latency histogram over the last `window` samples
+    """
+
+    # Upper bounds of the buckets in milliseconds
+    buckets_ms = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 16.0, 25.0, 33.0, 50.0, 100.0, 250.0, 500.0, 1000.0, np.inf)
+
+    def __init__(self, window: int = 10_000) -> None:
+        self._samples: deque[float] = deque(maxlen=window)
+        self._bucket_ids: deque[int] = deque(maxlen=window)
+        self.counts = np.zeros(len(self.buckets_ms), dtype=np.int64)
+        self.total = 0
+
+    def add(self, seconds: float) -> None:
+        if len(self._samples) == self._samples.maxlen:
+            self.counts[self._bucket_ids[0]] -= 1
+        bucket_id = int(np.searchsorted(self.buckets_ms, seconds * 1000))
+        self._samples.append(seconds)
+        self._bucket_ids.append(bucket_id)
+        self.counts[bucket_id] += 1
+        self.total += 1
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def copy(self) -> "LatencyHistogram":
+        histogram = LatencyHistogram(self._samples.maxlen or 0)
+        histogram._samples = self._samples.copy()
+        histogram._bucket_ids = self._bucket_ids.copy()
+        histogram.counts = self.counts.copy()
+        histogram.total = self.total
+        return histogram
+
+    def percentiles(self, q: tuple[float, ...] = (50, 95, 99)) -> dict[str, float]:
+        if len(self._samples) == 0:
+            return {}
+        samples = np.fromiter(self._samples, dtype=np.float64)
+        values = np.percentile(samples, q) * 1000
+        return {
+            "count": len(samples),
+            "mean_ms": float(samples.mean() * 1000),
+            **{f"p{p:g}_ms": float(v) for p, v in zip(q, values)},
+        }
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            **self.percentiles(),
+            "total": self.total,
+            "buckets": {
+                f"le_{bound:g}ms" if np.isfinite(bound) else "le_inf": int(count)
+                for bound, count in zip(self.buckets_ms, self.counts)
+            },
+        }
+
+
+class StageTimings:
+    """
+    Rolling latency histograms of the pipeline stages
+    """
+
+    def __init__(self, window: int = 10_000) -> None:
+        self.window = window
+        self._histograms: dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            if stage not in self._histograms:
+                self._histograms[stage] = LatencyHistogram(self.window)
+            self._histograms[stage].add(seconds)
+
+    @contextmanager
+    def measure(self, stage: str) -> Iterator[None]:
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start_time)
+
+    def copies(self) -> dict[str, LatencyHistogram]:
+        """
+        Copies of the histograms, percentiles are computed on them so `record` doesn't wait for a scrape
+        """
+        with self._lock:
+            return {stage: histogram.copy() for stage, histogram in self._histograms.items()}
+
+    def percentiles(self, stage: str, q: tuple[float, ...] = (50, 95, 99)) -> dict[str, float]:
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            histogram = None if histogram is None else histogram.copy()
+        return {} if histogram is None else histogram.percentiles(q)
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        return {stage: histogram.percentiles() for stage, histogram in self.copies().items()}
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        return {stage: histogram.snapshot() for stage, histogram in self.copies().items()}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+
+
+class StartupTimings:
+    """
+    Durations of the startup phases. Phases running in parallel are measured separately,
+    milestones are measured from the creation of the object.
+    """
+
+    def __init__(self) -> None:
+        self.start_time = time.perf_counter()
+        self._phases: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def record(self, phase: str, seconds: float) -> None:
+        with self._lock:
+            self._phases[phase] = seconds
+
+    @contextmanager
+    def measure(self, phase: str) -> Iterator[None]:
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(phase, time.perf_counter() - start_time)
+
+    def mark(self, milestone: str) -> None:
+        self.record(milestone, time.perf_counter() - self.start_time)
+
+    def snapshot(self) -> dict[str, float]:
+        with self._lock:
+            return {phase: round(seconds, 4) for phase, seconds in self._phases.items()}
+
+
+class Metrics:
+    """
+    Stage latencies, event counters and gauges of the recognition loop
+    """
+
+    def __init__(self, window: int = 10_000) -> None:
+        self.timings = StageTimings(window)
+        self.counters: dict[str, int] = {}
+        self.gauges: dict[str, Callable[[], Any]] = {}
+        self.start_time = time.time()
+        self._lock = threading.Lock()
+
+    def increment(self, counter: str, value: int = 1) -> None:
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + value
+
+    def add_gauge(self, name: str, read: Callable[[], Any]) -> None:
+        # Gauges are added while the exporters read them, e.g. on a model swap
+        with self._lock:
+            self.gauges[name] = read
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+        return {
+            "timestamp": time.time(),
+            "uptime": time.time() - self.start_time,
+            "counters": counters,
+            "gauges": {name: read() for name, read in gauges.items()},
+            "stages": self.timings.snapshot(),
+        }
+
+
+class MetricsServer:
+    """
+    Serves the metrics snapshot as JSON on http://host:port/metrics
+    """
+
+    def __init__(self, metrics: Metrics, port: int, host: str = "127.0.0.1") -> None:
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path.rstrip("/") not in ("", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = json.dumps(metrics.snapshot()).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, name="metrics-server", daemon=True)
+
+    def start(self) -> None:
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class MetricsDumper(threading.Thread):
+    """
+    Periodically writes the metrics snapshot to a JSON file
+    """
+
+    def __init__(self, metrics: Metrics, path: str, interval: float = 5.0) -> None:
+        super().__init__(name="metrics-dumper", daemon=True)
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self.stop_event = threading.Event()
+
+    def dump(self) -> None:
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.metrics.snapshot(), f, indent=2)
+        # Readers never see a partially written file
+        os.replace(tmp_path, self.path)
+
+    def run(self) -> None:
+        while not self.stop_event.wait(self.interval):
+            self.dump()
+
+    def stop(self) -> None:
+        self.stop_event.set()
+        self.join()
+        self.dump()
@@ -0,0 +1,138 @@
+import threading
+from collections import deque
+from collections.abc import Callable
+from typing import Generic, TypeVar
+
+T = TypeVar("T")
+U = TypeVar("U")
+
+
+class FrameQueue(Generic[T]):
+    """
+    Bounded queue between pipeline stages. By default a full queue discards its oldest item,
+    so a producer never waits for a slow consumer. With `drop_oldest=False` the producer waits
+    for free space instead, which makes runs over recorded sources deterministic.
+    `on_drop` is called with every discarded item.
+    """
+
+    def __init__(self, maxsize: int = 1, drop_oldest: bool = True, on_drop: Callable[[T], None] | None = None) -> None:
+        self._items: deque[T] = deque(maxlen=maxsize)
+        self._changed = threading.Condition()
+        self.maxsize = maxsize
+        self.drop_oldest = drop_oldest
+        self.on_drop = on_drop
+        self.closed = False
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def put(self, item: T) -> None:
+        with self._changed:
+            if not self.drop_oldest:
+                self._changed.wait_for(lambda: len(self._items) < self.maxsize or self.closed)
+            if len(self._items) == self.maxsize:
+                self.dropped += 1
+                if self.on_drop is not None:
+                    self.on_drop(self._items[0])
+            self._items.append(item)
+            self._changed.notify_all()
+
+    def get(self, timeout: float | None = None) -> T | None:
+        with self._changed:
+            if not self._changed.wait_for(lambda: len(self._items) > 0, timeout):
+                return None
+            item = self._items.popleft()
+            self._changed.notify_all()
+            return item
+
+    def close(self) -> None:
+        with self._changed:
+            self.closed = True
+            self._changed.notify_all()
+
+
+class Stage(threading.Thread, Generic[T, U]):
+    """
+    Worker that takes items from `inbox`, processes them and puts non-None results to `outbox`.
+    Without `inbox` the stage is a source: `process` is called with None and returning None ends the stream.
+    """
+
+    poll_interval = 0.1
+
+    def __init__(
+        self,
+        name: str,
+        process: Callable[[T | None], U | None],
+        stop_event: threading.Event,
+        inbox: FrameQueue[T] | None = None,
+        outbox: FrameQueue[U] | None = None,
+        upstream: "Stage | None" = None,  # type: ignore[type-arg]
+    ) -> None:
+        super().__init__(name=name, daemon=True)
+        self.process = process
+        self.stop_event = stop_event
+        self.inbox = inbox
+        self.outbox = outbox
+        self.upstream = upstream
+        self.done = threading.Event()
+
+    def run(self) -> None:
+        try:
+            while not self.stop_event.is_set():
+                item = None
+                if self.inbox is not None:
+                    item = self.inbox.get(self.poll_interval)
+                    if item is None:
+                        # Drain the inbox before following a finished upstream stage
+                        if self.upstream is not None and self.upstream.done.is_set() and len(self.inbox) == 0:
+                            break
+                        continue
+                result = self.process(item)
+                if result is None:
+                    if self.inbox is None:
+                        break
+                    continue
+                if self.outbox is not None:
+                    self.outbox.put(result)
+        except BaseException:
+            # A failed stage stops the whole pipeline
+            self.stop_event.set()
+            raise
+        finally:
+            self.done.set()
+
+
+class Pipeline:
+    def __init__(self) -> None:
+        self.stop_event = threading.Event()
+        self.stages: list[Stage] = []  # type: ignore[type-arg]
+
+    def add_stage(
+        self,
+        name: str,
+        process: Callable[[T | None], U | None],
+        inbox: FrameQueue[T] | None = None,
+        outbox: FrameQueue[U] | None = None,
+    ) -> None:
+        upstream = self.stages[-1] if self.stages and inbox is not None else None
+        self.stages.append(Stage(name, process, self.stop_event, inbox, outbox, upstream))
+
+    def start(self) -> None:
+        for stage in self.stages:
+            stage.start()
+
+    def is_running(self) -> bool:
+        return not self.stop_event.is_set() and not all(stage.done.is_set() for stage in self.stages)
+
+    def wait(self, timeout: float | None = None) -> bool:
+        return self.stages[-1].done.wait(timeout)
+
+    def stop(self) -> None:
+        self.stop_event.set()
+        for stage in self.stages:
+            # Wake up producers waiting on a full queue
+            if stage.outbox is not None:
+                stage.outbox.close()
+        for stage in self.stages:
+            stage.join()
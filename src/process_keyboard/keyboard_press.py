@@ -1,3 +1,4 @@
+import time
 from typing import TYPE_CHECKING
 
 from pynput import keyboard
@@ -11,12 +12,21 @@ if TYPE_CHECKING:
 keyboard_controller = keyboard.Controller()
 
 
-def press_keyboard(keys: list[keyboard.Key | keyboard.KeyCode]) -> None:
-    for key in keys[:-1]:
-        keyboard_controller.press(key)
-    keyboard_controller.tap(keys[-1])
-    for key in keys[:-1]:
-        keyboard_controller.release(key)
+def press_keyboard(keys: list[keyboard.Key | keyboard.KeyCode], hold: float = 0.0) -> None:
+    """
+    Press the keys in order and release them in reverse order, the last key is held for `hold` seconds
+    """
+    pressed = []
+    try:
+        for key in keys:
+            keyboard_controller.press(key)
+            pressed.append(key)
+        if hold > 0:
+            time.sleep(hold)
+    finally:
+        # A failed press must not leave modifiers stuck
+        for key in reversed(pressed):
+            keyboard_controller.release(key)
 
 
 def button_hook(button: QPushButton, app_window: "MainWindow") -> None:
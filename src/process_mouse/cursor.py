@@ -0,0 +1,113 @@
+import math
+
+import numpy as np
+
+
+class PointHistory:
+    """
+    Fixed-size ring buffer of cursor positions. Frames without a mouse gesture are stored as gaps,
+    so no movement is made across them.
+    """
+
+    def __init__(self, length: int = 16) -> None:
+        self.points = np.zeros((length, 2), dtype=np.int64)
+        self.valid = np.zeros(length, dtype=bool)
+        self._next = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _push(self, x: int, y: int, valid: bool) -> None:
+        self.points[self._next] = x, y
+        self.valid[self._next] = valid
+        self._next = (self._next + 1) % len(self.points)
+        self._count = min(self._count + 1, len(self.points))
+
+    def append(self, x: int, y: int) -> None:
+        self._push(x, y, True)
+
+    def append_gap(self) -> None:
+        self._push(0, 0, False)
+
+    def delta(self) -> tuple[int, int]:
+        """
+        Movement between the last two points, zero if one of them is a gap
+        """
+        if self._count < 2:
+            return 0, 0
+        last, previous = (self._next - 1) % len(self.points), (self._next - 2) % len(self.points)
+        if not (self.valid[last] and self.valid[previous]):
+            return 0, 0
+        dx, dy = self.points[last] - self.points[previous]
+        return int(dx), int(dy)
+
+
+class OneEuroFilter:
+    """
+    One Euro filter (Casiez et al., 2012): a low-pass filter whose cutoff frequency grows with the speed,
+    slow movements are smoothed to remove the jitter, fast ones are followed with little lag
+    """
+
+    def __init__(self, min_cutoff: float = 1.0, beta: float = 0.007, d_cutoff: float = 1.0) -> None:
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.value: np.ndarray | None = None
+        self.derivative = np.zeros(2)
+        self._timestamp = 0.0
+
+    @staticmethod
+    def alpha(cutoff: float, dt: float) -> float:
+        tau = 1.0 / (2 * math.pi * cutoff)
+        return 1.0 / (1.0 + tau / dt)
+
+    def reset(self) -> None:
+        self.value = None
+        self.derivative = np.zeros(2)
+
+    def __call__(self, point: np.ndarray, timestamp: float) -> np.ndarray:
+        dt = timestamp - self._timestamp
+        self._timestamp = timestamp
+        if self.value is None or dt <= 0:
+            self.value = point.astype(np.float64)
+            return self.value
+
+        derivative = (point - self.value) / dt
+        self.derivative += self.alpha(self.d_cutoff, dt) * (derivative - self.derivative)
+        cutoff = self.min_cutoff + self.beta * float(np.linalg.norm(self.derivative))
+        self.value = self.value + self.alpha(cutoff, dt) * (point - self.value)
+        return self.value
+
+
+class CursorTracker:
+    """
+    Filters the cursor positions of one hand and turns them into relative movements.
+    `prediction` extrapolates the filtered position by that many seconds to hide the latency of the pipeline.
+    """
+
+    def __init__(
+        self,
+        history_length: int = 16,
+        min_cutoff: float = 1.0,
+        beta: float = 0.007,
+        prediction: float = 0.0,
+    ) -> None:
+        self.history = PointHistory(history_length)
+        # A zero cutoff disables the filtering
+        self.filter = OneEuroFilter(min_cutoff, beta) if min_cutoff > 0 else None
+        self.prediction = prediction
+
+    def update(self, x: int, y: int, timestamp: float) -> tuple[int, int]:
+        if self.filter is not None:
+            point = self.filter(np.array((x, y), dtype=np.float64), timestamp)
+            if self.prediction > 0:
+                point = point + self.filter.derivative * self.prediction
+            x, y = round(point[0]), round(point[1])
+        self.history.append(x, y)
+        return self.history.delta()
+
+    def gap(self) -> None:
+        self.history.append_gap()
+        if self.filter is not None:
+            self.filter.reset()
@@ -1,40 +1,24 @@
 from pynput.mouse import Button, Controller
-from PySide6.QtCore import QPointList
 
 from src.process_mouse.mouse_enum import MouseEnum
 
+# Used only by the actuator thread
 mouse = Controller()
 
 
-def action_mouse(mouse_values: dict[str, str], label: str, is_start: bool = True) -> None:
+def mouse_button(mouse_values: dict[str, str], label: str) -> Button | None:
     action = mouse_values.get(label, None)
     if action is None:
-        return
+        return None
 
     match action:
-        case MouseEnum.move_mouse | MouseEnum.none:
-            return
         case MouseEnum.left_click:
-            button = Button.left
+            return Button.left
         case MouseEnum.right_click:
-            button = Button.right
+            return Button.right
         case _:
-            return
-    if is_start:
-        mouse.press(button)
-    else:
-        mouse.release(button)
+            return None
 
 
-def move_mouse(mouse_values: dict[str, str], point_history: QPointList, label: str) -> None:
-    action = mouse_values.get(label, "None")
-    if (
-        action == "None"
-        or len(point_history) <= 2
-        or (point_history[-1].x() + point_history[-1].y()) == 0
-        or (point_history[-2].x() + point_history[-2].y()) == 0
-    ):
-        return
-    diff_x = point_history[-1].x() - point_history[-2].x()
-    diff_y = point_history[-1].y() - point_history[-2].y()
-    mouse.move(diff_x, diff_y)
+def moves_cursor(mouse_values: dict[str, str], label: str) -> bool:
+    return mouse_values.get(label, "None") != "None"
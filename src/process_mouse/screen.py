@@ -0,0 +1,74 @@
+from PySide6.QtCore import QObject, QRect, Slot
+from PySide6.QtGui import QGuiApplication, QScreen
+
+from src.logger import get_logger
+
+
+class ScreenMapping(QObject):
+    """
+    Maps normalized camera coordinates to desktop pixels. The active region (x0, y0, x1, y1) of the camera frame
+    is stretched over one screen or, with `screen=None`, over the virtual desktop of all screens.
+    The geometry is read only when Qt reports a screen change, so the worker thread never calls into Qt,
+    it reads the precomputed transform, which is replaced as a whole.
+    """
+
+    def __init__(
+        self,
+        region: tuple[float, float, float, float] = (0.0, 0.0, 0.8, 0.8),
+        screen: int | None = None,
+        parent: QObject | None = None,
+    ) -> None:
+        super().__init__(parent)
+        x0, y0, x1, y1 = region
+        if not (0 <= x0 < x1 <= 1 and 0 <= y0 < y1 <= 1):
+            raise ValueError(f"Active region {region} must be x0 < x1 and y0 < y1 within [0, 1]")
+        self.logger = get_logger(self.__class__.__name__)
+        self.region = region
+        self.screen = screen
+        self.geometry = QRect()
+        # scale_x, scale_y, offset_x, offset_y
+        self.transform = (0.0, 0.0, 0.0, 0.0)
+
+        app = QGuiApplication.instance()
+        if isinstance(app, QGuiApplication):
+            app.screenAdded.connect(self.watch_screen)
+            app.screenRemoved.connect(self.refresh)
+            app.primaryScreenChanged.connect(self.refresh)
+            for qscreen in app.screens():
+                self.watch_screen(qscreen, refresh=False)
+            self.refresh()
+
+    @Slot(QScreen)
+    def watch_screen(self, qscreen: QScreen, refresh: bool = True) -> None:
+        qscreen.geometryChanged.connect(self.refresh)
+        if refresh:
+            self.refresh()
+
+    @Slot()
+    def refresh(self) -> None:
+        screens = QGuiApplication.screens()
+        if not screens:
+            return
+        if self.screen is None:
+            geometry = screens[0].virtualGeometry()
+        elif 0 <= self.screen < len(screens):
+            geometry = screens[self.screen].geometry()
+        else:
+            self.logger.warning("Screen %d not found, using all %d screens", self.screen, len(screens))
+            geometry = screens[0].virtualGeometry()
+        self.set_geometry(geometry)
+
+    def set_geometry(self, geometry: QRect) -> None:
+        x0, y0, x1, y1 = self.region
+        scale_x = geometry.width() / (x1 - x0)
+        scale_y = geometry.height() / (y1 - y0)
+        self.geometry = geometry
+        self.transform = (scale_x, scale_y, geometry.left() - x0 * scale_x, geometry.top() - y0 * scale_y)
+
+    def map(self, x: float, y: float) -> tuple[int, int]:
+        x0, y0, x1, y1 = self.region
+        scale_x, scale_y, offset_x, offset_y = self.transform
+        # Outside of the active region the cursor stays at the edge
+        x = min(max(x, x0), x1)
+        y = min(max(y, y0), y1)
+        return int(x * scale_x + offset_x), int(y * scale_y + offset_y)
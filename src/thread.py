@@ -1,148 +1,456 @@
-import copy
-import pickle
+import threading
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
 
 import cv2
-import mediapipe as mp
 import numpy as np
-from mediapipe.tasks.python.components.containers.landmark import NormalizedLandmark
-from PySide6.QtCore import QObject, QPoint, QPointList, Qt, QThread, Signal
-from PySide6.QtGui import QGuiApplication, QImage
+from PySide6.QtCore import QObject, QThread, Signal
+from PySide6.QtGui import QImage
 
-from src.drawing import calc_bounding_rect, calc_landmark_list, draw_info_text
+from src.buffers import BufferPool
+from src.classifier.backends import ClassifierBackend
+from src.classifier.cache import CachedClassifier
+from src.classifier.watcher import (
+    ModelWatcher,
+    load_holdout,
+    load_model,
+    model_signature,
+)
+from src.config import RecognitionConfig
+from src.drawing import (
+    calc_bounding_rect,
+    calc_landmark_batch,
+    draw_info_text,
+    draw_landmarks,
+    landmarks_to_array,
+)
+from src.events import GestureEvents
+from src.frame_source import FrameSource, Pacing, open_frame_source
+from src.hand_detector import HandDetector
+from src.hand_ids import HandIdTracker
+from src.logger import get_logger
+from src.metrics import Metrics, MetricsDumper, MetricsServer, StartupTimings
+from src.pipeline import FrameQueue, Pipeline
+from src.process_mouse.cursor import CursorTracker
+from src.process_mouse.screen import ScreenMapping
+
+if TYPE_CHECKING:
+    from src.keyframes import KeyframeDetector
+
+
+@dataclass
+class FramePacket:
+    index: int
+    timestamp: float
+    image: np.ndarray
+    results: Any = None
+    # Per hand, in the order of results.multi_hand_landmarks
+    hand_ids: list[int] = field(default_factory=list)
+    hand_sign_ids: list[int] = field(default_factory=list)
+    # Gestures of the hands, the labels can change with the model while the packet is rendered
+    hand_labels: list[str] = field(default_factory=list)
+    landmarks: np.ndarray | None = None
 
 
 class Thread(QThread):
     update_frame = Signal(QImage)
-    activate_key = Signal(str)
-    mouse_move = Signal(str, QPointList)
-    update_label = Signal()
+    # New gesture events can be taken from `events`, emitted once until they are taken
+    events_ready = Signal()
 
-    def __init__(self, device: int, parent: QObject | None = None):
+    def __init__(self, config: RecognitionConfig, parent: QObject | None = None, startup: StartupTimings | None = None):
         QThread.__init__(self, parent)
-        self.device = device
+        self.logger = get_logger(self.__class__.__name__)
+        self.config = config
+        self.device = config.device
         self.trained_file = None
         self.status = True
+        self.startup = startup if startup is not None else StartupTimings()
+        # The hand detector, the model and the frame source are created by warm_up in the background
+        self.mp_hands: Any = None
+        self.detector: HandDetector
+        self.keyframe_detector: KeyframeDetector
+        self.model: ClassifierBackend
+        # Set by the model watcher, taken by the classify stage between frames
+        self.next_model: ClassifierBackend | None = None
+        self.next_model_lock = threading.Lock()
+        self.model_signature: str | None = None
+
+        self.hand_id_tracker = HandIdTracker()
+        self.events = GestureEvents(self.events_ready.emit)
+        self.history_length = 16
+        self.cursors: dict[int, CursorTracker] = {}
+        # Created in the GUI thread, so it follows the Qt screen notifications there
+        self.screen_mapping = ScreenMapping(config.active_region, config.screen, self)
+
+        # Gesture of every class id and ids of the gestures that move the cursor, set by the loaded model
+        self.labels: list[str] = []
+        self.mouse_ids: list[int] = []
+        # Size of the preview
+        self.cam_width = 640
+        self.cam_height = 480
+
+        # Size of every queue between the pipeline stages, a full queue drops its oldest frame
+        self.queue_size = 1
+        # Frames and previews are written into reused buffers, a frame goes back to the pool after the render
+        # stage or when a queue drops it, a preview after the GUI has copied it into a pixmap
+        self.frame_pool = BufferPool()
+        self.raw_frame: np.ndarray | None = None
+        self.flipped_frame: np.ndarray | None = None
+        self.preview_visible = True
+        self.preview_time = 0.0
+        self.pending_previews: deque[np.ndarray] = deque()
+        self.preview_lock = threading.Lock()
+        # Previews sent to the GUI and not yet shown, the preview is skipped while the GUI is behind
+        self.max_pending_previews = 2
+        self.frame_source: FrameSource | None = None
+        self.frame_index = 0
+        self.fps = 0
+        self.fps_start_time = time.time()
+        self.fps_frame_count = 0
+        self.metrics = Metrics()
+        self.timings = self.metrics.timings
+        self.metrics.add_gauge("fps", lambda: self.fps)
+        self.metrics.add_gauge("startup", self.startup.snapshot)
+        self.metrics.add_gauge("frame_pool", self.frame_pool.stats)
+        self.metrics.add_gauge("events", self.events.stats)
+
+    def load_detector(self) -> None:
+        # MediaPipe takes long to import, so it is imported in the background as well
+        import mediapipe as mp
+
+        from src.keyframes import KeyframeDetector, KeyframeScheduler, LandmarkPredictor
+
         self.mp_hands = mp.solutions.hands
-        self.hands = self.mp_hands.Hands(
-            static_image_mode=True,
-            max_num_hands=1,
+        self.detector = HandDetector(
+            mode=self.config.hands_mode,
+            max_num_hands=self.config.max_num_hands,
             min_detection_confidence=0.7,
             min_tracking_confidence=0.5,
+            inference_width=self.config.inference_width,
+        )
+        # The first inference initializes the graph, it shouldn't delay the first frame
+        blank = np.zeros((self.cam_height, self.cam_width, 3), dtype=np.uint8)
+        self.detector.hands.process(self.detector.inference_image(blank))
+        self.keyframe_detector = KeyframeDetector(
+            self.detector,
+            KeyframeScheduler(
+                interval=self.config.keyframe_interval,
+                max_interval=self.config.max_keyframe_interval,
+                motion_threshold=self.config.motion_threshold,
+            ),
+            LandmarkPredictor(),
         )
-        self.mp_drawings = mp.solutions.drawing_utils
+        self.metrics.add_gauge("detector", self.keyframe_detector.stats)
 
-        self.history_length = 16
-        self.point_history = QPointList()
-
-        self.labels = [
-            "two_fingers_near",
-            "one",
-            "two",
-            "three",
-            "four",
-            "five",
-            "ok",
-            "c",
-            "heavy",
-            "hang",
-            "palm",
-            "l",
-            "like",
-            "dislike",
-            "fist",
-        ]
-        self.mouse_ids = [0, 1, 11]
-        with open("model.pkl", "rb") as f:
-            self.model = pickle.load(f)
-        self.cam_width = 640
-        self.cam_height = 480
+    def load_model(self) -> None:
+        # Taken before loading, so a change during the loading is seen by the watcher
+        self.model_signature = model_signature(self.config.model_path)
+        # sklearn pickle, NumPy bundle (.npz), ONNX or TorchScript model, picked by the file extension
+        # A watched model file may be rewritten in place, so its weights are copied instead of memory mapped
+        self.use_model(self.wrap_model(load_model(self.config.model_path, mmap=not self.config.watch_model)))
 
-    def draw_image(self, image: np.ndarray) -> None:
+    def wrap_model(self, model: ClassifierBackend) -> ClassifierBackend:
+        if self.config.cache_size > 0:
+            model = CachedClassifier(model, self.config.cache_tolerance, self.config.cache_size)
+        return model
+
+    def use_model(self, model: ClassifierBackend) -> None:
+        self.model = model
+        self.labels = model.labels
+        self.mouse_ids = [model.labels.index(label) for label in model.mouse_labels]
+        if isinstance(model, CachedClassifier):
+            self.metrics.add_gauge("classifier_cache", model.stats)
+
+    def swap_model(self, model: ClassifierBackend) -> None:
+        """
+        Called by the model watcher with a loaded and checked model, it's used from the next frame
+        """
+        model = self.wrap_model(model)
+        with self.next_model_lock:
+            self.next_model = model
+
+    def start_model_watcher(self) -> ModelWatcher | None:
+        if not self.config.watch_model:
+            return None
+        holdout = None if self.config.holdout_path is None else load_holdout(self.config.holdout_path)
+        watcher = ModelWatcher(
+            self.config.model_path,
+            self.swap_model,
+            self.model_signature,
+            self.config.watch_interval,
+            holdout,
+            self.config.min_holdout_accuracy,
+        )
+        self.metrics.add_gauge("model_watcher", watcher.stats)
+        watcher.start()
+        return watcher
+
+    def open_source(self) -> None:
+        self.frame_source = open_frame_source(
+            self.device, self.config.source, self.config.pacing, self.config.source_fps
+        )
+
+    def warm_up(self) -> None:
+        """
+        Creates the hand detector, loads the model and opens the frame source in parallel,
+        the phase durations are recorded to `startup`
+        """
+        phases = {"detector": self.load_detector, "model": self.load_model, "source": self.open_source}
+
+        def run_phase(phase: str) -> None:
+            with self.startup.measure(phase):
+                phases[phase]()
+
+        with self.startup.measure("warm_up"), ThreadPoolExecutor(len(phases), "warm-up") as executor:
+            futures = [executor.submit(run_phase, phase) for phase in phases]
+            # Raises the first error after all phases are finished
+            for future in futures:
+                future.result()
+
+    def set_preview_visible(self, visible: bool) -> None:
+        """
+        Called from the GUI thread, the preview is not drawn while nobody can see it
+        """
+        self.preview_visible = visible
+
+    def preview_due(self) -> bool:
+        if not self.preview_visible or self.config.preview_fps <= 0:
+            return False
+        with self.preview_lock:
+            if len(self.pending_previews) >= self.max_pending_previews:
+                return False
+        now = time.perf_counter()
+        if now - self.preview_time < 1 / self.config.preview_fps:
+            return False
+        self.preview_time = now
+        return True
+
+    def preview_image(self, image: np.ndarray) -> np.ndarray:
         h, w, ch = image.shape
-        img = QImage(image.data, w, h, ch * w, QImage.Format_RGB888)
-        scaled_img = img.scaled(self.cam_width, self.cam_height, Qt.KeepAspectRatio)
-        self.update_frame.emit(scaled_img)
+        scale = min(self.cam_width / w, self.cam_height / h)
+        preview = self.frame_pool.acquire((round(h * scale), round(w * scale), ch))
+        if scale == 1:
+            np.copyto(preview, image)
+        else:
+            # The only copy of the frame, also makes drawing cheaper on large frames
+            cv2.resize(image, (preview.shape[1], preview.shape[0]), dst=preview, interpolation=cv2.INTER_AREA)
+        return preview
+
+    def draw_image(self, image: np.ndarray) -> None:
+        with self.timings.measure("qimage"):
+            h, w, ch = image.shape
+            # Wraps the pool buffer without a copy, it is kept until the GUI calls preview_shown
+            img = QImage(image.data, w, h, ch * w, QImage.Format_RGB888)
+        with self.preview_lock:
+            self.pending_previews.append(image)
+        self.update_frame.emit(img)
+
+    def preview_shown(self) -> None:
+        """
+        Called from the GUI thread once the oldest sent preview is copied into a pixmap
+        """
+        with self.preview_lock:
+            if not self.pending_previews:
+                return
+            image = self.pending_previews.popleft()
+        self.frame_pool.release(image)
+
+    def release_packet(self, packet: FramePacket) -> None:
+        self.frame_pool.release(packet.image)
 
     def run(self) -> None:
-        cap = cv2.VideoCapture(self.device)
-        self.point_history.append(QPoint(0, 0))
-        fps_start_time = time.time()
-        fps = 0
-        frame_count = 0
-
-        while self.status:
-            ret, image = cap.read()
-            if not ret:
-                break
-            image = cv2.flip(image, 1)
-            image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-
-            debug_image = copy.deepcopy(image)
-            image.flags.writeable = False
-            results = self.hands.process(image)
-            image.flags.writeable = True
-
-            frame_count += 1
-
-            if (time.time() - fps_start_time) > 1:
-                fps = frame_count // (time.time() - fps_start_time)
-                fps_start_time = time.time()
-                frame_count = 0
-
-            cv2.putText(debug_image, f"FPS: {fps}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 0), 2, cv2.LINE_AA)
-
-            if results.multi_hand_landmarks is None:
-                self.point_history.append(QPoint(0, 0))
-                self.update_label.emit()
-                self.draw_image(debug_image)
-                continue
-
-            hand_landmarks = results.multi_hand_landmarks[0]
-            handedness = results.multi_handedness[0]
-
-            brect = calc_bounding_rect(debug_image, hand_landmarks)
-            landmark_list = calc_landmark_list(hand_landmarks)
-            is_right = handedness.classification[0].label == "Right"
-            data = np.append(landmark_list, int(is_right)).reshape(1, -1)
-
-            hand_sign_id = int(self.model.predict(data)[0])
-
-            self.mp_drawings.draw_landmarks(debug_image, hand_landmarks, self.mp_hands.HAND_CONNECTIONS)
-            debug_image = draw_info_text(
-                debug_image,
-                brect,
-                handedness,
-                self.labels[hand_sign_id],
-            )
+        try:
+            self.warm_up()
+        except Exception as err:
+            self.logger.error("Startup failed: %s", err)
+            if self.frame_source is not None:
+                self.frame_source.release()
+            return
+        assert self.frame_source is not None
+        # Opened in parallel with the detector, the keyframe interval follows the frame rate of the source
+        self.keyframe_detector.scheduler.target_fps = self.frame_source.fps
+        self.logger.info("Warm-up finished: %s", self.startup.snapshot())
+        # Closed while warming up
+        if not self.status:
+            self.frame_source.release()
+            return
+        self.fps_start_time = time.time()
+
+        # Recorded sources read as fast as possible must not lose frames, otherwise runs are not reproducible
+        drop_oldest = self.config.source is None or self.config.pacing == Pacing.realtime
+        detect_queue: FrameQueue[FramePacket] = FrameQueue(self.queue_size, drop_oldest, self.release_packet)
+        classify_queue: FrameQueue[FramePacket] = FrameQueue(self.queue_size, drop_oldest, self.release_packet)
+        render_queue: FrameQueue[FramePacket] = FrameQueue(self.queue_size, drop_oldest, self.release_packet)
+
+        queues = {"detect": detect_queue, "classify": classify_queue, "render": render_queue}
+        self.metrics.add_gauge("dropped_frames", lambda: {name: queue.dropped for name, queue in queues.items()})
+        exporters = self.start_metrics_exporters()
+        watcher = self.start_model_watcher()
 
+        pipeline = Pipeline()
+        pipeline.add_stage("capture", self.capture, outbox=detect_queue)
+        pipeline.add_stage("detect", self.detect, inbox=detect_queue, outbox=classify_queue)
+        pipeline.add_stage("classify", self.classify, inbox=classify_queue, outbox=render_queue)
+        # Also returns the frames to the pool when the preview is disabled
+        pipeline.add_stage("render", self.render, inbox=render_queue)
+        pipeline.start()
+
+        while self.status and pipeline.is_running():
+            pipeline.wait(0.1)
+        pipeline.stop()
+        for exporter in exporters:
+            exporter.stop()
+        if watcher is not None:
+            watcher.stop()
+
+        self.frame_source.release()
+        self.keyframe_detector.close()
+        cv2.destroyAllWindows()
+        self.logger.info("Hand detector (%s mode): %s", self.detector.mode.value, self.keyframe_detector.stats())
+
+    def capture(self, _: FramePacket | None = None) -> FramePacket | None:
+        assert self.frame_source is not None
+        with self.timings.measure("capture"):
+            raw_frame = self.frame_source.read(self.raw_frame)
+            if raw_frame is None:
+                return None
+            # The scratch buffers are reallocated by OpenCV when the frame size changes
+            self.raw_frame = raw_frame
+            self.flipped_frame = cv2.flip(raw_frame, 1, dst=self.flipped_frame)
+            image = self.frame_pool.acquire(raw_frame.shape)
+            cv2.cvtColor(self.flipped_frame, cv2.COLOR_BGR2RGB, dst=image)
+        self.frame_index += 1
+        return FramePacket(self.frame_index, time.time(), image)
+
+    def detect(self, packet: FramePacket | None) -> FramePacket | None:
+        assert packet is not None
+        packet.image.flags.writeable = False
+        with self.timings.measure("mediapipe"):
+            packet.results = self.keyframe_detector.process(packet.image, packet.timestamp)
+        packet.image.flags.writeable = True
+        return packet
+
+    def classify(self, packet: FramePacket | None) -> FramePacket | None:
+        assert packet is not None
+        if packet.index == 1:
+            self.startup.mark("first_frame")
+            self.logger.info("First frame classified: %s", self.startup.snapshot())
+        if self.next_model is not None:
+            with self.next_model_lock:
+                model, self.next_model = self.next_model, None
+            if model is not None:
+                self.use_model(model)
+                self.metrics.increment("model_swaps")
+        self.count_fps()
+        self.metrics.increment("frames")
+        results = packet.results
+
+        if results.multi_hand_landmarks is None:
+            self.metrics.increment("no_hand_frames")
+            self.hand_id_tracker.update(np.empty((0, 21, 3), dtype=np.float32))
+            self.release_lost_hands()
+            self.timings.record("decision", time.time() - packet.timestamp)
+            return packet
+
+        with self.timings.measure("landmarks"):
+            if isinstance(results.multi_hand_landmarks, np.ndarray):
+                # Predicted landmarks of a frame between keyframes
+                landmark_arrays = results.multi_hand_landmarks
+            else:
+                landmark_arrays = np.empty((len(results.multi_hand_landmarks), 21, 3), dtype=np.float32)
+                for hand_landmarks, out in zip(results.multi_hand_landmarks, landmark_arrays):
+                    landmarks_to_array(hand_landmarks, out)
+            is_right = [handedness.classification[0].label == "Right" for handedness in results.multi_handedness]
+            data = np.column_stack((calc_landmark_batch(landmark_arrays), is_right))
+
+        # All hands are classified with one call, the per call overhead of the model dominates
+        with self.timings.measure("predict"):
+            hand_sign_ids = [int(hand_sign_id) for hand_sign_id in self.model.predict(data)]
+
+        hand_ids = self.hand_id_tracker.update(landmark_arrays)
+        self.release_lost_hands()
+        packet.hand_ids = hand_ids
+        packet.hand_sign_ids = hand_sign_ids
+        packet.hand_labels = [self.labels[hand_sign_id] for hand_sign_id in hand_sign_ids]
+        packet.landmarks = landmark_arrays
+
+        for hand_id, hand_sign_id, label, hand_landmarks in zip(
+            hand_ids, hand_sign_ids, packet.hand_labels, landmark_arrays
+        ):
+            cursor = self.cursors.get(hand_id)
+            if cursor is None:
+                cursor = self.cursors[hand_id] = CursorTracker(
+                    self.history_length,
+                    min_cutoff=self.config.cursor_min_cutoff,
+                    beta=self.config.cursor_beta,
+                    prediction=self.config.cursor_prediction,
+                )
             if hand_sign_id in self.mouse_ids:
                 # 8 is index of index point finger
-                move_x, move_y = self.mouse_move_size(hand_landmarks.landmark[8])
+                move_x, move_y = self.screen_mapping.map(hand_landmarks[8, 0], hand_landmarks[8, 1])
 
-                self.point_history.append(QPoint(move_x, move_y))
-                self.mouse_move.emit(self.labels[hand_sign_id], self.point_history)
+                dx, dy = cursor.update(move_x, move_y, packet.timestamp)
+                self.events.mouse(hand_id, label, dx, dy)
             else:
-                self.point_history.append(QPoint(0, 0))
-                self.activate_key.emit(self.labels[hand_sign_id])
+                cursor.gap()
+                self.events.key(hand_id, label)
 
-            self.draw_image(debug_image)
+        self.timings.record("decision", time.time() - packet.timestamp)
+        return packet
 
-            if len(self.point_history) > self.history_length:
-                self.point_history.removeFirst(len(self.point_history) - self.history_length)
+    def release_lost_hands(self) -> None:
+        for hand_id in self.hand_id_tracker.lost_ids:
+            self.cursors.pop(hand_id, None)
+            self.events.lost(hand_id)
 
-        cap.release()
-        cv2.destroyAllWindows()
+    def render(self, packet: FramePacket | None) -> None:
+        assert packet is not None
+        if not self.preview_due():
+            self.metrics.increment("preview_skipped")
+            self.release_packet(packet)
+            return
+
+        with self.timings.measure("drawing"):
+            debug_image = self.preview_image(packet.image)
+            cv2.putText(
+                debug_image, f"FPS: {self.fps}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 0), 2, cv2.LINE_AA
+            )
 
-    def mouse_move_size(self, landmark: NormalizedLandmark) -> tuple[int, int]:
-        landmark_x = min(int(landmark.x * self.cam_width), self.cam_width - 1)
-        landmark_y = min(int(landmark.y * self.cam_height), self.cam_height - 1)
+            results = packet.results
+            if results.multi_hand_landmarks is not None and packet.landmarks is not None:
+                for hand_id, label, landmark_array, handedness in zip(
+                    packet.hand_ids, packet.hand_labels, packet.landmarks, results.multi_handedness
+                ):
+                    brect = calc_bounding_rect(debug_image, landmark_array)
+                    draw_landmarks(debug_image, landmark_array, self.mp_hands.HAND_CONNECTIONS)
+                    if self.config.max_num_hands > 1:
+                        label = f"{hand_id}:{label}"
+                    debug_image = draw_info_text(debug_image, brect, handedness, label)
 
-        percent_web_x = min(landmark_x / (self.cam_width * 0.8), 100)
-        percent_web_y = min(landmark_y / (self.cam_height * 0.8), 100)
+        self.release_packet(packet)
+        self.draw_image(debug_image)
 
-        display = QGuiApplication.primaryScreen().size()
+    def start_metrics_exporters(self) -> list[MetricsServer | MetricsDumper]:
+        exporters: list[MetricsServer | MetricsDumper] = []
+        if self.config.metrics_port is not None:
+            try:
+                exporters.append(MetricsServer(self.metrics, self.config.metrics_port))
+                self.logger.info("Serving metrics on http://127.0.0.1:%d/metrics", self.config.metrics_port)
+            except OSError as err:
+                # A busy port must not stop the recognition
+                self.logger.error("Can't serve metrics on port %d: %s", self.config.metrics_port, err)
+        if self.config.metrics_file is not None:
+            exporters.append(MetricsDumper(self.metrics, self.config.metrics_file, self.config.metrics_interval))
+        for exporter in exporters:
+            exporter.start()
+        return exporters
 
-        move_x = int(display.width() * percent_web_x)
-        move_y = int(display.height() * percent_web_y)
-        return move_x, move_y
+    def count_fps(self) -> None:
+        self.fps_frame_count += 1
+        if (time.time() - self.fps_start_time) > 1:
+            self.fps = int(self.fps_frame_count // (time.time() - self.fps_start_time))
+            self.fps_start_time = time.time()
+            self.fps_frame_count = 0
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+from sklearn.datasets import make_classification
+from sklearn.ensemble import (
+    ExtraTreesClassifier,
+    GradientBoostingClassifier,
+    RandomForestClassifier,
+)
+from sklearn.exceptions import ConvergenceWarning
+from sklearn.linear_model import LogisticRegression, RidgeClassifier, SGDClassifier
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.neural_network import MLPClassifier
+from sklearn.svm import SVC, LinearSVC
+
+from src.classifier.bundle import FEATURE_SCHEMA
+from src.classifier.numpy_predictor import (
+    compile_estimator,
+    load_predictor,
+    save_predictor,
+)
+
+ESTIMATORS = [
+    LogisticRegression(max_iter=1000),
+    LinearSVC(),
+    RidgeClassifier(),
+    SGDClassifier(random_state=0),
+    SVC(kernel="linear"),
+    SVC(kernel="poly", degree=3),
+    SVC(kernel="rbf"),
+    SVC(kernel="sigmoid"),
+    MLPClassifier(hidden_layer_sizes=(32, 16), max_iter=200, random_state=0),
+    MLPClassifier(hidden_layer_sizes=(16,), activation="tanh", max_iter=200, random_state=0),
+    RandomForestClassifier(n_estimators=10, random_state=0),
+    ExtraTreesClassifier(n_estimators=10, random_state=0),
+    GradientBoostingClassifier(n_estimators=10, random_state=0),
+]
+
+
+def dataset(n_classes: int) -> tuple[np.ndarray, np.ndarray]:
+    X, y = make_classification(
+        n_samples=400,
+        n_features=FEATURE_SCHEMA.n_features,
+        n_informative=10,
+        n_classes=n_classes,
+        random_state=0,
+    )
+    # Labels of processed.npy are floats
+    return X, y.astype(np.float64)
+
+
+@pytest.mark.filterwarnings("ignore", category=ConvergenceWarning)
+@pytest.mark.parametrize("n_classes", [2, 4])
+@pytest.mark.parametrize("estimator", ESTIMATORS, ids=lambda estimator: repr(estimator))
+def test_predict_matches_sklearn(estimator, n_classes):
+    X, y = dataset(n_classes)
+    estimator.fit(X, y)
+    predictor = compile_estimator(estimator)
+    np.testing.assert_array_equal(predictor.predict(X), estimator.predict(X))
+    # Buffers of a batch of another size are reallocated
+    np.testing.assert_array_equal(predictor.predict(X[:7]), estimator.predict(X[:7]))
+
+
+@pytest.mark.filterwarnings("ignore", category=ConvergenceWarning)
+@pytest.mark.parametrize("estimator", ESTIMATORS, ids=lambda estimator: repr(estimator))
+def test_saved_predictor_matches_sklearn(estimator, tmp_path):
+    X, y = dataset(4)
+    estimator.fit(X, y)
+    path = str(tmp_path / "model.npz")
+    save_predictor(compile_estimator(estimator), path)
+    np.testing.assert_array_equal(load_predictor(path).predict(X), estimator.predict(X))
+
+
+def test_unsupported_estimator():
+    X, y = dataset(4)
+    with pytest.raises(TypeError):
+        compile_estimator(KNeighborsClassifier().fit(X, y))
@@ -2,16 +2,21 @@ import sys
 
 from PySide6.QtWidgets import QApplication
 
-from src.args_parser import get_device
+from src.args_parser import get_config
+from src.logger import get_logger
 from src.main_window import MainWindow
-import sklearn
+from src.metrics import StartupTimings
 
 if __name__ == "__main__":
-    device = get_device()
+    startup = StartupTimings()
+    config = get_config()
     app = QApplication()
 
-    window = MainWindow("keymap.json", device)
+    # The recognition thread loads the models in the background, the window is shown right away
+    window = MainWindow("keymap.json", config, startup)
     window.show()
+    startup.mark("window_shown")
+    get_logger("ui_app").info("Window shown in %.3f s", startup.snapshot()["window_shown"])
 
     try:
         sys.exit(app.exec())